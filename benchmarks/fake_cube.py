@@ -0,0 +1,253 @@
+"""
+Local stand-in for a homee cube.
+
+Implements the parts of the cube API pyhomee uses: the access token request,
+the websocket connection with the node dump (GET:all), pushed attribute
+updates and node and group commands, which are acknowledged with attribute
+updates. The number of nodes and attributes, the update rate, the latency,
+periodic disconnects and one group per node profile can be configured.
+
+pyhomee always connects to port 7681, so bind the fake cube to a local
+address which is not used by a real cube, e.g. 127.0.0.1.
+
+Usage: python benchmarks/fake_cube.py --nodes 100 --attributes 10 --rate 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+
+from aiohttp import web, WSMsgType
+
+_LOGGER = logging.getLogger(__name__)
+
+PORT = 7681
+TOKEN = 'fake-token'
+
+# (profile, attribute types) the simulated nodes cycle through
+NODE_TEMPLATES = [
+    (3009, [5, 7, 8]),   # temperature sensor: Temperature, RelativeHumidity, BatteryLevel
+    (16, [1, 3, 4]),     # switch: OnOff, CurrentEnergyUse, AccumulatedEnergyUse
+    (1004, [1, 2]),      # dimmable light: OnOff, DimmingLevel
+]
+# attribute types added to reach the requested number of attributes
+FILLER_TYPES = [3, 4, 11]
+
+COMMAND_RE = re.compile(r'PUT:nodes/(-?\d+)/attributes/(\d+)\?target_value=(.*)')
+HOMEEGRAM_RE = re.compile(r'PUT:homeegrams/(\d+)\?play=1')
+GROUP_COMMAND_RE = re.compile(r'PUT:groups/(\d+)/attributes\?target_value=(.*)&attribute_type=(\d+)')
+
+
+def build_attribute(node_id, attribute_id, attribute_type, value=0):
+    return {
+        'id': attribute_id,
+        'node_id': node_id,
+        'type': attribute_type,
+        'unit': 'n%2Fa',
+        'current_value': value,
+        'target_value': value,
+        'editable': 1,
+    }
+
+
+def build_nodes(count, attributes):
+    """Return count nodes with attributes attributes each, plus the cube node."""
+    nodes = [{
+        'id': -1, 'name': 'homee', 'profile': 1, 'state': 1, 'state_changed': 0, 'added': 0,
+        'attributes': [build_attribute(-1, 1, 205)],
+    }]
+    attribute_id = 2
+    for node_id in range(1, count + 1):
+        profile, types = NODE_TEMPLATES[node_id % len(NODE_TEMPLATES)]
+        types = (types + FILLER_TYPES * attributes)[:max(attributes, len(types))]
+        node_attributes = []
+        for attribute_type in types:
+            node_attributes.append(build_attribute(node_id, attribute_id, attribute_type))
+            attribute_id += 1
+        nodes.append({
+            'id': node_id, 'name': 'Node%20{}'.format(node_id), 'profile': profile,
+            'state': 1, 'state_changed': 0, 'added': 0, 'attributes': node_attributes,
+        })
+    return nodes
+
+
+def build_homeegrams(count):
+    return [{'id': homeegram_id, 'name': 'Homeegram%20{}'.format(homeegram_id), 'play': 0,
+             'state': 1, 'visible': 1, 'active': 1} for homeegram_id in range(1, count + 1)]
+
+
+def build_groups(nodes):
+    """Return one group per node profile and the relationships of the nodes."""
+    groups, relationships = [], []
+    for profile, _ in NODE_TEMPLATES:
+        group_id = len(groups) + 1
+        groups.append({
+            'id': group_id, 'name': 'Profile%20{}'.format(profile), 'image': '', 'note': '',
+            'owner': 1, 'state': 1, 'category': 0, 'phonetic_name': '', 'services': 0,
+            'order': group_id, 'added': 0,
+        })
+        for node in nodes:
+            if node['id'] != -1 and node['profile'] == profile:
+                relationships.append({'id': len(relationships) + 1, 'group_id': group_id,
+                                      'node_id': node['id'], 'homeegram_id': 0, 'order': 0})
+    return groups, relationships
+
+
+class FakeCube:
+    """Websocket and token endpoint of a simulated cube."""
+
+    def __init__(self, host='127.0.0.1', nodes=10, attributes=5, rate=0, latency=0,
+                 disconnect_every=None, groups=False, homeegrams=0):
+        self.host = host
+        self.nodes = build_nodes(nodes, attributes)
+        self.groups, self.relationships = build_groups(self.nodes) if groups else ([], [])
+        self.attributes = {attr['id']: attr for node in self.nodes for attr in node['attributes']}
+        self.rate = rate
+        self.latency = latency
+        self.disconnect_every = disconnect_every
+        self.commands = []
+        self.group_commands = []
+        self.homeegrams = build_homeegrams(homeegrams)
+        self.homeegrams_played = []
+        self.messages_sent = 0
+        self._clients = set()
+        self._tasks = []
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/access_token', self._access_token)
+        app.router.add_get('/connection', self._connection)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, PORT).start()
+        if self.rate:
+            self._tasks.append(asyncio.ensure_future(self._push_updates()))
+        if self.disconnect_every:
+            self._tasks.append(asyncio.ensure_future(self._disconnect_periodically()))
+        _LOGGER.info("Fake cube listening on %s:%s with %d nodes", self.host, PORT, len(self.nodes))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for ws in list(self._clients):
+            await ws.close()
+        await self._runner.cleanup()
+
+    async def push_burst(self, count):
+        """Push count attribute updates as fast as possible."""
+        for _ in range(count):
+            await self._broadcast(self._random_update())
+
+    async def disconnect(self):
+        """Close all websocket connections."""
+        for ws in list(self._clients):
+            await ws.close()
+
+    async def _access_token(self, request):
+        return web.Response(text='access_token={}&user_id=1&device_id=1&expires=31536000'.format(TOKEN))
+
+    async def _connection(self, request):
+        if request.query.get('access_token') != TOKEN:
+            raise web.HTTPUnauthorized()
+        ws = web.WebSocketResponse(protocols=('v2',))
+        await ws.prepare(request)
+        self._clients.add(ws)
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    await self._handle(ws, msg.data)
+        finally:
+            self._clients.discard(ws)
+        return ws
+
+    async def _handle(self, ws, message):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if message == 'GET:all':
+            await self._send(ws, {'all': {'nodes': self.nodes, 'groups': self.groups,
+                                          'relationships': self.relationships,
+                                          'homeegrams': self.homeegrams}})
+            return
+        match = COMMAND_RE.match(message)
+        if match:
+            attribute = self.attributes.get(int(match.group(2)))
+            self.commands.append((int(match.group(1)), int(match.group(2)), match.group(3)))
+            if attribute is not None:
+                value = float(match.group(3))
+                attribute['current_value'] = attribute['target_value'] = value
+                await self._broadcast({'attribute': attribute})
+            return
+        match = GROUP_COMMAND_RE.match(message)
+        if match:
+            group_id, value, attribute_type = int(match.group(1)), float(match.group(2)), int(match.group(3))
+            self.group_commands.append((group_id, attribute_type, value))
+            node_ids = set(rel['node_id'] for rel in self.relationships if rel['group_id'] == group_id)
+            for attribute in self.attributes.values():
+                if attribute['node_id'] in node_ids and attribute['type'] == attribute_type:
+                    attribute['current_value'] = attribute['target_value'] = value
+                    await self._broadcast({'attribute': attribute})
+            return
+        match = HOMEEGRAM_RE.match(message)
+        if match:
+            self.homeegrams_played.append(int(match.group(1)))
+            return
+        _LOGGER.debug("Unhandled message %s", message)
+
+    def _random_update(self):
+        attribute = random.choice(list(self.attributes.values()))
+        attribute['current_value'] = attribute['target_value'] = round(random.uniform(0, 100), 1)
+        return {'attribute': attribute}
+
+    async def _push_updates(self):
+        while True:
+            await asyncio.sleep(1 / self.rate)
+            await self._broadcast(self._random_update())
+
+    async def _disconnect_periodically(self):
+        while True:
+            await asyncio.sleep(self.disconnect_every)
+            _LOGGER.info("Disconnecting %d clients", len(self._clients))
+            await self.disconnect()
+
+    async def _broadcast(self, data):
+        for ws in list(self._clients):
+            await self._send(ws, data)
+
+    async def _send(self, ws, data):
+        if ws.closed:
+            return
+        await ws.send_str(json.dumps(data))
+        self.messages_sent += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--nodes', type=int, default=10)
+    parser.add_argument('--attributes', type=int, default=5)
+    parser.add_argument('--rate', type=float, default=0, help='attribute updates per second')
+    parser.add_argument('--latency', type=float, default=0, help='seconds before answering')
+    parser.add_argument('--disconnect-every', type=float, default=None,
+                        help='close all connections every N seconds')
+    parser.add_argument('--groups', action='store_true', help='add one group per node profile')
+    parser.add_argument('--homeegrams', type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    cube = FakeCube(args.host, args.nodes, args.attributes, args.rate, args.latency,
+                    args.disconnect_every, args.groups, args.homeegrams)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(cube.start())
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(cube.stop())
+
+
+if __name__ == '__main__':
+    main()
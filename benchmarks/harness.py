@@ -0,0 +1,132 @@
+"""
+Boot the homee integration in Home Assistant against the fake cube.
+
+Measures the startup time until all entities exist, the dispatch of a burst
+of attribute updates and the latency of light commands, without a physical
+cube. With --groups the lights are also switched by their homee group, with
+--record the received messages are logged for benchmarks/replay.py.
+
+Usage: python benchmarks/harness.py --nodes 100 --attributes 10 --burst 10000 --groups
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_cube import FakeCube  # noqa: E402
+
+COMPONENT_DIR = os.path.join(os.path.dirname(__file__), '..', 'custom_components', 'homee')
+
+
+async def wait_until_stable(hass, timeout, settle=1.0):
+    """Wait until the number of states did not change for settle seconds."""
+    start = time.perf_counter()
+    count, changed = -1, start
+    while time.perf_counter() - start < timeout:
+        current = len(hass.states.async_entity_ids())
+        if current != count:
+            count, changed = current, time.perf_counter()
+        elif time.perf_counter() - changed >= settle:
+            return changed - start, count
+        await asyncio.sleep(0.05)
+    return None, count
+
+
+async def async_boot(config_dir, host, groups, **options):
+    from homeassistant.core import HomeAssistant
+    from homeassistant.setup import async_setup_component
+
+    hass = HomeAssistant()
+    hass.config.config_dir = config_dir
+    hass.config.skip_pip = True
+    await async_setup_component(hass, 'homee', {'homee': {
+        'cube': host, 'username': 'harness', 'password': 'harness', 'snapshot': False,
+        'groups': groups, **options,
+    }})
+    await hass.async_start()
+    return hass
+
+
+async def run(args):
+    from homeassistant.const import EVENT_STATE_CHANGED
+
+    cube = FakeCube(args.host, args.nodes, args.attributes, latency=args.latency,
+                    groups=args.groups)
+    await cube.start()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.makedirs(os.path.join(config_dir, 'custom_components'))
+        os.symlink(os.path.abspath(COMPONENT_DIR),
+                   os.path.join(config_dir, 'custom_components', 'homee'))
+
+        start = time.perf_counter()
+        options = {}
+        if args.record:
+            options['record'] = {'path': os.path.abspath(args.record)}
+        hass = await async_boot(config_dir, args.host, args.groups, **options)
+        setup = time.perf_counter() - start
+        startup, entities = await wait_until_stable(hass, args.timeout)
+        print("setup: {:.1f} ms, entities: {}, all entities after: {}".format(
+            setup * 1000, entities, 'timeout' if startup is None else '{:.1f} ms'.format(
+                (setup + startup) * 1000)))
+        for hub in hass.data['homee'].values():
+            print("node dump processed in {} ms".format(hub.supervisor.diagnostics()['dump_ms']))
+
+        state_changes = []
+        hass.bus.async_listen(EVENT_STATE_CHANGED, state_changes.append)
+
+        start = time.perf_counter()
+        await cube.push_burst(args.burst)
+        await hass.async_block_till_done()
+        elapsed = time.perf_counter() - start
+        print("burst of {} updates: {:.1f} ms, {:.0f} updates/s, {} state writes".format(
+            args.burst, elapsed * 1000, args.burst / elapsed, len(state_changes)))
+
+        lights = [entity_id for entity_id in hass.states.async_entity_ids('light')
+                  if not entity_id.startswith('light.homee_group_')]
+        sent = len(cube.commands)
+        start = time.perf_counter()
+        await hass.services.async_call('light', 'turn_on', {'entity_id': lights}, blocking=True)
+        while len(cube.commands) - sent < len(lights) and time.perf_counter() - start < args.timeout:
+            await asyncio.sleep(0.001)
+        print("turn on {} lights: {:.1f} ms until received by the cube".format(
+            len(lights), (time.perf_counter() - start) * 1000))
+
+        if args.groups:
+            group_lights = [entity_id for entity_id in hass.states.async_entity_ids('light')
+                            if entity_id.startswith('light.homee_group_')]
+            updates = len(state_changes)
+            start = time.perf_counter()
+            await hass.services.async_call('light', 'turn_off', {'entity_id': group_lights},
+                                           blocking=True)
+            while len(state_changes) - updates < len(lights) and time.perf_counter() - start < args.timeout:
+                await asyncio.sleep(0.001)
+            print("turn off {} lights by group: {:.1f} ms until all states changed".format(
+                len(lights), (time.perf_counter() - start) * 1000))
+
+        await hass.async_stop()
+    await cube.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--nodes', type=int, default=100)
+    parser.add_argument('--attributes', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--burst', type=int, default=10000)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--groups', action='store_true', help='expose one homee group per profile')
+    parser.add_argument('--record', metavar='FILE', help='log the received messages to FILE')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""
+Benchmarks for the hot paths of the homee integration.
+
+Feeds synthetic pyhomee nodes through node discovery, entity construction,
+update dispatch, attribute type resolution, state attribute construction and
+the availability check at several scales and reports throughput, latency
+percentiles and peak memory. Results can be saved as baseline and compared
+against later runs.
+
+Usage:
+    python benchmarks/hot_paths.py --save benchmarks/baseline.json
+    python benchmarks/hot_paths.py --compare benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import custom_components.homee as homee  # noqa: E402
+from custom_components.homee import util  # noqa: E402
+from custom_components.homee.hub import HomeeHub  # noqa: E402
+from fake_cube import build_nodes  # noqa: E402
+
+SCALES = [10, 100, 1000]
+ATTRIBUTES = 10
+UPDATES = 10000
+
+
+class RecordingCube:
+    """Cube replacement ignoring the registrations."""
+
+    def register(self, node, callback):
+        pass
+
+    def register_all(self, callback):
+        pass
+
+
+class BenchHass:
+    """Minimal hass object for the hub, discarding platform loads."""
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def async_create_task(self, coro):
+        coro.close()
+
+
+def make_nodes(count):
+    from pyhomee.models import Node
+    return [Node(node) for node in build_nodes(count, ATTRIBUTES)[1:]]
+
+
+def make_updates(nodes, count):
+    from pyhomee.models import Attribute
+    attributes = [attr for node in nodes for attr in node.attributes]
+    updates = []
+    for _ in range(count):
+        attr = random.choice(attributes)
+        updates.append(Attribute({
+            'id': attr.id, 'node_id': attr.node_id, 'type': attr.type, 'unit': attr.unit,
+            'current_value': round(random.uniform(0, 100), 1), 'editable': attr.editable,
+        }))
+    return updates
+
+
+def make_hub(loop):
+    """Return a hub of a cube ignoring the registrations."""
+    async def create():
+        # the pyhomee cube opens its http session on the running loop
+        return HomeeHub(BenchHass(loop), SimpleNamespace(entry_id='bench'), {
+            'cube': '127.0.0.1', 'username': 'bench', 'password': 'bench', 'snapshot': False})
+    hub = loop.run_until_complete(create())
+    hub.dispatcher = homee.HomeeDispatcher(RecordingCube())
+    return hub
+
+
+def close_hub(loop, hub):
+    """Cancel the pending discovery and close the http session of the cube."""
+    if hub._flush_handle is not None:
+        hub._flush_handle.cancel()
+        hub._flush_handle = None
+    loop.run_until_complete(hub.cube.session.close())
+
+
+def create_entities(hub, nodes):
+    """Create the sensor entities like the sensor platform does."""
+    from custom_components.homee.sensor import HomeeSensor
+    entities = []
+    for node in nodes:
+        for attribute in node.attributes:
+            if hub.is_sensor_attribute(node, attribute):
+                entity = HomeeSensor(None, node, attribute, hub)
+                entity.async_schedule_update_ha_state = lambda force_refresh=False: None
+                entities.append(entity)
+    return entities
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        'p50_us': round(samples[len(samples) // 2] * 1e6, 2),
+        'p95_us': round(samples[int(len(samples) * 0.95)] * 1e6, 2),
+        'p99_us': round(samples[int(len(samples) * 0.99)] * 1e6, 2),
+    }
+
+
+def measure(items, func):
+    """Call func for each item, returning throughput, percentiles and peak memory."""
+    samples = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    for item in items:
+        begin = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - begin)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = {'ops_per_s': round(len(samples) / total), 'peak_kb': round(peak / 1024)}
+    result.update(percentiles(samples))
+    return result
+
+
+def bench_discovery(loop, count):
+    hub = make_hub(loop)
+    # platforms taking the devices, so discovery ends with the platform callback
+    for component in ('sensor', 'switch', 'light', 'cover', 'climate', 'binary_sensor'):
+        hub.register_platform(component, lambda devices: None)
+
+    def discover(node):
+        loop.run_until_complete(hub.async_handle_node(node))
+        # hand the devices to the platforms now instead of after the debounce
+        hub._flush_handle.cancel()
+        hub._flush_discovery()
+
+    result = measure(make_nodes(count), discover)
+    close_hub(loop, hub)
+    return result
+
+
+def bench_entity_construction(loop, count):
+    hub = make_hub(loop)
+    nodes = make_nodes(count)
+    for node in nodes:
+        hub.dispatcher.track_node(node)
+    result = measure(nodes, lambda node: create_entities(hub, [node]))
+    close_hub(loop, hub)
+    return result
+
+
+def bench_dispatch(loop, count):
+    hub = make_hub(loop)
+    nodes = make_nodes(count)
+    for node in nodes:
+        hub.dispatcher.track_node(node)
+    create_entities(hub, nodes)
+    dispatch = hub.dispatcher.async_dispatch
+    result = measure(make_updates(nodes, UPDATES),
+                     lambda attr: loop.run_until_complete(dispatch(attr.node_id, None, attr)))
+    close_hub(loop, hub)
+    return result
+
+
+def bench_get_attr_type(count):
+    nodes = make_nodes(count)
+    attributes = [attr for node in nodes for attr in node.attributes]
+    return measure(attributes, util.get_attr_type)
+
+
+def bench_state_attributes(loop, count):
+    hub = make_hub(loop)
+    nodes = make_nodes(count)
+    for node in nodes:
+        hub.dispatcher.track_node(node)
+    # node wide entities expose all attributes of their node
+    entities = [homee.HomeeDevice(None, node, hub) for node in nodes]
+    updates = make_updates(nodes, UPDATES)
+    by_node = {entity._homee_node.id: entity for entity in entities}
+
+    def update_and_read(attr):
+        hub.dispatcher.find_store(attr.node_id).set_value(attr.id, attr.value)
+        return by_node[attr.node_id].device_state_attributes
+
+    result = measure(updates, update_and_read)
+    close_hub(loop, hub)
+    return result
+
+
+def bench_available(loop, count):
+    hub = make_hub(loop)
+    hub.supervisor.connected = True
+    nodes = make_nodes(count)
+    entities = [homee.HomeeDevice(None, node, hub) for node in nodes]
+    # property access on every state write
+    result = measure(entities * (UPDATES // count), lambda entity: entity.available)
+    close_hub(loop, hub)
+    return result
+
+
+def run_all():
+    loop = asyncio.get_event_loop()
+    results = {}
+    for count in SCALES:
+        results['discovery/{}'.format(count)] = bench_discovery(loop, count)
+        results['entity_construction/{}'.format(count)] = bench_entity_construction(loop, count)
+        results['dispatch/{}'.format(count)] = bench_dispatch(loop, count)
+        results['get_attr_type/{}'.format(count)] = bench_get_attr_type(count)
+        results['state_attributes/{}'.format(count)] = bench_state_attributes(loop, count)
+        results['available/{}'.format(count)] = bench_available(loop, count)
+    return results
+
+
+def print_results(results, baseline=None):
+    print("{:<28} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        'benchmark', 'ops/s', 'p50 us', 'p95 us', 'p99 us', 'peak kB'))
+    for name, result in results.items():
+        line = "{:<28} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            name, result['ops_per_s'], result['p50_us'], result['p95_us'], result['p99_us'],
+            result['peak_kb'])
+        if baseline and name in baseline:
+            change = (result['ops_per_s'] - baseline[name]['ops_per_s']) / baseline[name]['ops_per_s']
+            line += " {:+7.1%}".format(change)
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--save', help='write the results as baseline to this file')
+    parser.add_argument('--compare', help='compare the throughput with this baseline')
+    args = parser.parse_args()
+
+    random.seed(0)
+    results = run_all()
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_results(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
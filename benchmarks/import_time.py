@@ -0,0 +1,72 @@
+"""
+Measure the import cost of the homee integration on a cold start.
+
+Each measurement runs in a fresh interpreter: the time to import the
+integration module, the modules it pulled in, and the time of the first
+node discovery, which imports pyhomee. The platforms are imported one by
+one afterwards, as Home Assistant does when their first device is
+discovered.
+
+Usage: python benchmarks/import_time.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+PLATFORMS = ['sensor', 'switch', 'light', 'cover', 'climate', 'binary_sensor', 'scene']
+
+# modules which should only be loaded once they are needed
+WATCHED = ['pyhomee', 'aiohttp', 'websockets'] + \
+    ['homeassistant.components.{}'.format(platform) for platform in PLATFORMS]
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import custom_components.homee
+integration = time.perf_counter() - start
+loaded = [name for name in {watched!r} if name in sys.modules]
+from types import SimpleNamespace
+node = SimpleNamespace(id=1, profile=10, attributes=[])
+start = time.perf_counter()
+custom_components.homee.map_homee_node(node)
+first_node = time.perf_counter() - start
+platforms = {{}}
+for platform in {platforms!r}:
+    start = time.perf_counter()
+    __import__('custom_components.homee.' + platform)
+    platforms[platform] = time.perf_counter() - start
+print(json.dumps({{'integration': integration, 'loaded': loaded, 'first_node': first_node,
+                  'platforms': platforms}}))
+"""
+
+
+def probe():
+    code = PROBE.format(root=ROOT, watched=WATCHED, platforms=PLATFORMS)
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [probe() for _ in range(args.repeat)]
+    print("import integration: {:8.1f} ms".format(
+        statistics.median(run['integration'] for run in runs) * 1000))
+    print("loaded by the import: {}".format(', '.join(runs[0]['loaded']) or 'none of ' + ', '.join(WATCHED)))
+    print("first node, imports pyhomee: {:6.1f} ms".format(
+        statistics.median(run['first_node'] for run in runs) * 1000))
+    for platform in PLATFORMS:
+        print("platform {:<14} {:6.1f} ms".format(
+            platform, statistics.median(run['platforms'][platform] for run in runs) * 1000))
+
+
+if __name__ == '__main__':
+    main()
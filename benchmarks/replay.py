@@ -0,0 +1,71 @@
+"""
+Replay recorded homee websocket traffic into Home Assistant.
+
+Boots the integration against a fake cube without nodes, so the entities are
+available, and replays logs recorded with the record option (or
+harness.py --record) through the message handling of the cube at the given
+speed, 0 for maximum speed. Reports the dispatch throughput and the state
+writes the recorded traffic causes.
+
+Usage: python benchmarks/replay.py homee_traffic.log.1.gz homee_traffic.log --speed 0
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_cube import FakeCube  # noqa: E402
+from harness import COMPONENT_DIR, async_boot, wait_until_stable  # noqa: E402
+
+
+async def run(args):
+    from homeassistant.const import EVENT_STATE_CHANGED
+
+    cube = FakeCube(args.host, 0, 0)
+    await cube.start()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.makedirs(os.path.join(config_dir, 'custom_components'))
+        os.symlink(os.path.abspath(COMPONENT_DIR),
+                   os.path.join(config_dir, 'custom_components', 'homee'))
+        hass = await async_boot(config_dir, args.host, False, diagnostics=True)
+        await wait_until_stable(hass, args.timeout)
+
+        state_changes = []
+        hass.bus.async_listen(EVENT_STATE_CHANGED, state_changes.append)
+        hub = next(iter(hass.data['homee'].values()))
+        start = time.perf_counter()
+        result = await hub.async_replay([os.path.abspath(path) for path in args.logs], args.speed)
+        await hass.async_block_till_done()
+        elapsed = time.perf_counter() - start
+        print("replayed {} messages at speed {}: {:.1f} ms, {} messages/s".format(
+            result['messages'], args.speed or 'max', elapsed * 1000,
+            result['messages_per_second']))
+        print("state writes: {} issued, {} states changed, {} entities".format(
+            result['state_writes'], len(state_changes), len(hass.states.async_entity_ids())))
+        dispatch = hub.metrics.histograms.get('dispatch')
+        if dispatch is not None:
+            print("dispatch: {}".format(dispatch.as_dict()))
+
+        await hass.async_stop()
+    await cube.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('logs', nargs='+', help='recorded logs, oldest first')
+    parser.add_argument('--speed', type=float, default=0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Compare the time until the homee entities exist on a start with and without
+a stored node snapshot.
+
+Boots the integration in Home Assistant twice against the fake cube, which
+answers the node dump after --cube-latency seconds. The first start has no
+snapshot yet, so the entities can only be created once the cube answered;
+stopping Home Assistant stores the snapshot. The second start restores the
+entities from it through HomeeHub.async_start before the cube answers.
+
+Usage: python benchmarks/startup_snapshot.py --nodes 150 --cube-latency 2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_cube import FakeCube  # noqa: E402
+from harness import COMPONENT_DIR, async_boot, wait_until_stable  # noqa: E402
+
+
+async def wait_for_entities(hass, count, timeout):
+    """Return the seconds until count states exist, None on timeout."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if len(hass.states.async_entity_ids()) >= count:
+            return time.perf_counter() - start
+        await asyncio.sleep(0.005)
+    return None
+
+
+async def run(args):
+    cube = FakeCube(args.host, args.nodes, args.attributes, latency=args.cube_latency)
+    await cube.start()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.makedirs(os.path.join(config_dir, 'custom_components'))
+        os.symlink(os.path.abspath(COMPONENT_DIR),
+                   os.path.join(config_dir, 'custom_components', 'homee'))
+
+        start = time.perf_counter()
+        hass = await async_boot(config_dir, args.host, False, snapshot=True)
+        cold, count = None, 0
+        # nothing exists before the cube answered, then wait for the last entity
+        if await wait_for_entities(hass, 1, args.timeout) is not None:
+            waited = time.perf_counter() - start
+            stable, count = await wait_until_stable(hass, args.timeout)
+            cold = None if stable is None else waited + stable
+        # stopping stores the snapshot
+        await hass.async_stop()
+
+        start = time.perf_counter()
+        hass = await async_boot(config_dir, args.host, False, snapshot=True)
+        setup = time.perf_counter() - start
+        restored = await wait_for_entities(hass, count, args.timeout) if count else None
+        warm = None if restored is None else setup + restored
+        await hass.async_stop()
+    await cube.stop()
+
+    def format_ms(seconds):
+        return 'timeout' if seconds is None else '{:8.1f} ms'.format(seconds * 1000)
+
+    print("nodes: {}, entities: {}, cube latency: {} s".format(args.nodes, count, args.cube_latency))
+    print("without snapshot: {}".format(format_ms(cold)))
+    print("with snapshot:    {}".format(format_ms(warm)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--nodes', type=int, default=150)
+    parser.add_argument('--attributes', type=int, default=10)
+    parser.add_argument('--cube-latency', type=float, default=2.0,
+                        help='seconds until the cube sends its node dump')
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.get_event_loop().run_until_complete(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,160 +5,251 @@ For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/homee/
 """
 import asyncio
+import copy
 import logging
-from collections import defaultdict
+import time
+import urllib.parse
 
 import voluptuous as vol
 
-from homeassistant.const import EVENT_HOMEASSISTANT_STOP
-from homeassistant.core import callback
+from homeassistant import config_entries
 from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers import discovery
 from homeassistant.helpers.entity import Entity
 from homeassistant.util import (slugify)
-from .util import get_attr_by_type, get_attr_type
-
-REQUIREMENTS = ['pyhomee==0.0.4']
+from .const import (
+    CONF_AGGREGATE, CONF_BACKUPS, CONF_BUFFER, CONF_CUBE, CONF_DEADBAND, CONF_DIAGNOSTICS,
+    CONF_DIAGNOSTICS_ATTRIBUTES, CONF_EXCLUDE_ATTRIBUTE_TYPES, CONF_EXCLUDE_GROUPS, CONF_EXCLUDE_NODES,
+    CONF_EXCLUDE_PROFILES, CONF_EVENTS, CONF_FILTER, CONF_GROUPS, CONF_HOMEEGRAMS, CONF_HOST,
+    CONF_INCLUDE_ATTRIBUTE_TYPES, CONF_INCLUDE_GROUPS, CONF_INCLUDE_NODES, CONF_INCLUDE_PROFILES,
+    CONF_INTERVAL, CONF_MAX_BYTES, CONF_MAX_IN_FLIGHT, CONF_NAME, CONF_OPTIMISTIC,
+    CONF_OPTIMISTIC_TIMEOUT, CONF_PASSWORD, CONF_PATH, CONF_PORT, CONF_QUEUE_SIZE, CONF_RECORD,
+    CONF_RELAY, CONF_SIZE, CONF_SNAPSHOT,
+    CONF_STATE_ATTRIBUTES, CONF_THROTTLE, CONF_USERNAME, DEFAULT_ATTRIBUTE_POLICIES, DOMAIN,
+    EVENT_DIAGNOSTICS, EVENT_SERIES, HOMEE_DEVICE_ID_FORMAT, HOMEE_GROUP_ID_FORMAT, HOMEE_ID_FORMAT,
+    POLICY_ALL)
+from .dispatcher import HomeeDispatcher  # noqa: F401
+from .hub import HomeeHub
+from .throttle import StateWriteCoalescer
+from .timeseries import AGGREGATES, write_series
+from .util import get_attr_type, get_attr_type_id, is_available
+from .util import is_sensor_attribute, map_homee_node  # noqa: F401
 
 _LOGGER = logging.getLogger(__name__)
 
-DOMAIN = 'homee'
-
-HOMEE_CUBE = None
-
-# attributes that are not added as sensors
-DISCOVER_SENSOR_ATTRIBUTES = [
-    'DimmingLevel',
-    'OnOff',
-    'Color',
-    'OpenClose',
-    'Temperature',
-    'TargetTemperature',
-    'BatteryLowAlarm',
-    'LinkQuality',
-    'IdentificationMode',
-    'SoftwareRevision'
-]
-
-CONF_CUBE = 'cube'
-CONF_USERNAME = 'username'
-CONF_PASSWORD = 'password'
-
-HOMEE_ID_FORMAT = '{}_{}'
-
-HOMEE_NODES = {}
-HOMEE_ATTRIBUTES = defaultdict(list)
-
-HOMEE_IMPORT_GROUP = 'HASS'
+FILTER_SCHEMA = vol.Schema({
+    vol.Optional(CONF_INCLUDE_NODES, default=[]): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+    vol.Optional(CONF_EXCLUDE_NODES, default=[]): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+    vol.Optional(CONF_INCLUDE_PROFILES, default=[]): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+    vol.Optional(CONF_EXCLUDE_PROFILES, default=[]): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+    vol.Optional(CONF_INCLUDE_GROUPS, default=[]): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(CONF_EXCLUDE_GROUPS, default=[]): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(CONF_INCLUDE_ATTRIBUTE_TYPES, default=[]): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(CONF_EXCLUDE_ATTRIBUTE_TYPES, default=[]): vol.All(cv.ensure_list, [cv.string]),
+})
+
+CUBE_SCHEMA = vol.Schema({
+    vol.Required(CONF_CUBE): cv.string,
+    vol.Required(CONF_USERNAME): cv.string,
+    vol.Required(CONF_PASSWORD): cv.string,
+    # prefix of the entity ids, needed to tell several cubes apart
+    vol.Optional(CONF_NAME): cv.string,
+    vol.Optional(CONF_SNAPSHOT, default=True): cv.boolean,
+    vol.Optional(CONF_MAX_IN_FLIGHT, default=8): cv.positive_int,
+    vol.Optional(CONF_OPTIMISTIC, default=False): cv.boolean,
+    vol.Optional(CONF_OPTIMISTIC_TIMEOUT, default=10): vol.Coerce(float),
+    vol.Optional(CONF_DIAGNOSTICS, default=False): cv.boolean,
+    vol.Optional(CONF_DIAGNOSTICS_ATTRIBUTES, default=False): cv.boolean,
+    vol.Optional(CONF_FILTER, default={}): FILTER_SCHEMA,
+    vol.Optional(CONF_GROUPS, default=False): cv.boolean,
+    # add the visible homeegrams as scenes
+    vol.Optional(CONF_HOMEEGRAMS, default=False): cv.boolean,
+    # attribute types fired as homee_attribute_changed events on every update
+    vol.Optional(CONF_EVENTS, default=[]): vol.All(cv.ensure_list, [cv.string]),
+    # attribute types shown as state attributes per policy, or all
+    vol.Optional(CONF_STATE_ATTRIBUTES, default={}): {
+        vol.In(list(DEFAULT_ATTRIBUTE_POLICIES)): vol.Any(
+            POLICY_ALL, vol.All(cv.ensure_list, [cv.string])),
+    },
+    # state write coalescing per attribute type, e.g. CurrentEnergyUse
+    vol.Optional(CONF_THROTTLE, default={}): {
+        cv.string: vol.Schema({
+            vol.Optional(CONF_INTERVAL, default=0): vol.Coerce(float),
+            vol.Optional(CONF_DEADBAND, default=0): vol.Coerce(float),
+        }),
+    },
+    # raw value buffers per attribute type, the sensor state is an aggregate
+    vol.Optional(CONF_BUFFER, default={}): {
+        cv.string: vol.Schema({
+            vol.Optional(CONF_SIZE, default=3600): cv.positive_int,
+            vol.Optional(CONF_INTERVAL, default=60): vol.Coerce(float),
+            vol.Optional(CONF_AGGREGATE, default='mean'): vol.In(AGGREGATES),
+        }),
+    },
+    # log of the received messages, relative to the configuration directory
+    vol.Optional(CONF_RECORD): vol.Schema({
+        vol.Required(CONF_PATH): cv.string,
+        vol.Optional(CONF_MAX_BYTES, default=10 * 1024 * 1024): cv.positive_int,
+        vol.Optional(CONF_BACKUPS, default=5): cv.positive_int,
+    }),
+    # serve the cube API to further consumers over this connection
+    vol.Optional(CONF_RELAY): vol.Schema({
+        vol.Optional(CONF_HOST, default='0.0.0.0'): cv.string,
+        vol.Optional(CONF_PORT, default=7681): cv.port,
+        # messages queued per consumer before it is disconnected
+        vol.Optional(CONF_QUEUE_SIZE, default=1000): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }),
+})
 
+# one cube or a list of cubes, each imported as config entry
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: vol.Schema({
-        vol.Required(CONF_CUBE): cv.string,
-        vol.Required(CONF_USERNAME): cv.string,
-        vol.Required(CONF_PASSWORD): cv.string,
-    }),
+    DOMAIN: vol.All(cv.ensure_list, [CUBE_SCHEMA]),
 }, extra=vol.ALLOW_EXTRA)
 
-HOMEE_COMPONENTS = [
-    'sensor', 'switch', 'light', 'cover', 'climate', 'binary_sensor', 'homee'
-]
+SERVICE_CUBE = 'cube'
+SERVICE_ENTITY_ID = 'entity_id'
+SERVICE_SINCE = 'since'
+SERVICE_PATH = 'path'
+SERVICE_SPEED = 'speed'
+SERVICE_DAYS = 'days'
+DEFAULT_SERIES_PATH = 'homee_series.json'
 
 
 async def async_setup(hass, base_config):
-    """Set up for Vera devices."""
-    global HOMEE_CUBE
-    from pyhomee import HomeeCube
-    task = None
-
-    def stop_subscription(event):
-        """Shutdown Homee subscriptions and subscription thread on exit."""
-        _LOGGER.info("Shutting down homee websocket")
-        if task is not None:
-            task.cancel()
+    """Import the configured cubes and register the services."""
+    hass.data.setdefault(DOMAIN, {})
+
+    def get_hub(call):
+        """Return the hub addressed by the cube field of a service call."""
+        hubs = list(hass.data[DOMAIN].values())
+        cube = call.data.get(SERVICE_CUBE)
+        if cube is None and len(hubs) == 1:
+            return hubs[0]
+        for hub in hubs:
+            if cube is not None and cube in (hub.cube.hostname, hub.name, hub.entry_id):
+                return hub
+        _LOGGER.error("Unknown cube %s, configured cubes: %s",
+                      cube, [hub.cube.hostname for hub in hubs])
+        return None
 
     async def play_homeegram(call):
-        id = call.data.get("homeegram_id")
-        await HOMEE_CUBE.play_homeegram(id)
+        hub = get_hub(call)
+        if hub is not None:
+            await hub.async_play_homeegrams([call.data.get("homeegram_id", call.data.get("name"))])
 
-    async def set_mode(call):
-        mode = call.data.get("mode")
-        component = hass.get_component("homee.cube")
-        await component.set_mode(mode)
+    async def play_homeegrams(call):
+        hub = get_hub(call)
+        if hub is not None:
+            await hub.async_play_homeegrams(call.data.get("homeegrams", []))
 
+    async def send_batch(call):
+        hub = get_hub(call)
+        if hub is not None:
+            await hub.async_send_batch(call.data.get("commands", []))
 
-    config = base_config.get(DOMAIN)
+    async def set_mode(call):
+        hub = get_hub(call)
+        if hub is not None:
+            await hub.async_set_mode(call.data.get("mode"))
+
+    async def diagnostics(call):
+        for hub in hass.data[DOMAIN].values():
+            data = hub.diagnostics()
+            data['cube'] = hub.cube.hostname
+            _LOGGER.info("homee diagnostics: %s", data)
+            hass.bus.async_fire(EVENT_DIAGNOSTICS, data)
+
+    async def export_series(call):
+        entity_ids = call.data.get(SERVICE_ENTITY_ID)
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        since = call.data.get(SERVICE_SINCE)
+        if since is not None:
+            since = time.time() - since
+        series = {}
+        for hub in hass.data[DOMAIN].values():
+            for entity in hub.buffered_entities():
+                if entity_ids is None or entity.entity_id in entity_ids:
+                    series[entity.entity_id] = {
+                        'unit': entity.unit_of_measurement,
+                        'samples': entity.buffer.samples(since),
+                    }
+        # the samples go to a file, the recorder stores every event
+        path = hass.config.path(call.data.get(SERVICE_PATH, DEFAULT_SERIES_PATH))
+        if await hass.async_add_executor_job(write_series, path, series):
+            hass.bus.async_fire(EVENT_SERIES, {
+                'path': path,
+                'samples': {entity_id: len(data['samples']) for entity_id, data in series.items()},
+            })
+
+    async def import_history(call):
+        hub = get_hub(call)
+        if hub is not None:
+            entity_ids = call.data.get(SERVICE_ENTITY_ID)
+            if isinstance(entity_ids, str):
+                entity_ids = [entity_ids]
+            await hub.async_import_history(entity_ids, int(call.data.get(SERVICE_DAYS, 10)))
+
+    async def replay_traffic(call):
+        hub = get_hub(call)
+        if hub is not None:
+            paths = call.data.get(SERVICE_PATH, [])
+            if isinstance(paths, str):
+                paths = [paths]
+            await hub.async_replay(paths, float(call.data.get(SERVICE_SPEED, 1)))
 
-    # Get Homee specific configuration.
-    hostname = config.get(CONF_CUBE)
-    username = config.get(CONF_USERNAME)
-    password = config.get(CONF_PASSWORD)
     hass.services.async_register(DOMAIN, "play_homeegram", play_homeegram)
-    #hass.services.async_register(DOMAIN, "set_mode", set_mode)
-
-    # Initialize the Homee Cube
-    HOMEE_CUBE = HomeeCube(hostname, username, password)
-    HOMEE_CUBE.register_all(create_handle_node_callback(hass, base_config))
-    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, stop_subscription)
+    hass.services.async_register(DOMAIN, "play_homeegrams", play_homeegrams)
+    hass.services.async_register(DOMAIN, "send_batch", send_batch)
+    hass.services.async_register(DOMAIN, "set_mode", set_mode)
+    hass.services.async_register(DOMAIN, "diagnostics", diagnostics)
+    hass.services.async_register(DOMAIN, "export_series", export_series)
+    hass.services.async_register(DOMAIN, "replay_traffic", replay_traffic)
+    hass.services.async_register(DOMAIN, "import_history", import_history)
+
+    for config in base_config.get(DOMAIN, []):
+        hass.async_create_task(hass.config_entries.flow.async_init(
+            DOMAIN, context={'source': config_entries.SOURCE_IMPORT}, data=dict(config)))
+    return True
 
-    task = asyncio.get_event_loop().create_task(HOMEE_CUBE.run())
 
-    #hass.services.async_register(DOMAIN, "set_mode", set_mode)
+async def async_setup_entry(hass, entry):
+    """Connect to a cube and set up its platforms."""
+    hub = HomeeHub(hass, entry, CUBE_SCHEMA(dict(entry.data)))
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = hub
+    # platforms are forwarded by the hub when their first devices are discovered
+    await hub.async_start()
+    return True
 
 
+async def async_unload_entry(hass, entry):
+    """Disconnect from a cube and remove its entities."""
+    hub = hass.data[DOMAIN][entry.entry_id]
+    await hub.async_stop()
+    unloaded = await asyncio.gather(*[
+        hass.config_entries.async_forward_entry_unload(entry, component)
+        for component in hub.platforms])
+    if all(unloaded):
+        hass.data[DOMAIN].pop(entry.entry_id)
+    return all(unloaded)
 
-    return True
 
+class HomeeDevice(Entity):
+    """Representation of a Homee device entity.
 
-def create_handle_node_callback(hass, base_config):
-    @callback
-    async def handle_node_callback(node):
-        if node.id in HOMEE_NODES:
-            return
-        _LOGGER.info("Discovered new node %s: %s" % (node.id, node.name))
-        HOMEE_NODES[node.id] = node
-        devices = defaultdict(list)
-        node_type = map_homee_node(node)
-        if node_type:
-            devices[node_type].append({'node': node})
-        for attribute in node.attributes:
-            if get_attr_type(attribute) not in DISCOVER_SENSOR_ATTRIBUTES and node.id != -1:
-                devices['sensor'].append({'node': node, 'attribute': attribute})
-
-        discover_routines = []
-        for component in HOMEE_COMPONENTS:
-            if len(devices[component]) > 0:
-                hass.async_create_task(discovery.async_load_platform(hass, component, DOMAIN, {
-                    'devices': devices[component],
-                }, base_config))
-        #asyncio.gather(*discover_routines))
-    return handle_node_callback
-
-
-def map_homee_node(node):
-    """Map homee nodes to Home Assistant types."""
-    from pyhomee import const
-    if node.id == -1:
-        return 'sensor'
-    if node.profile in const.PROFILE_TYPES[const.DISCOVER_LIGHTS]:
-        return 'light'
-    if node.profile in const.PROFILE_TYPES[const.DISCOVER_CLIMATE]:
-        return 'climate'
-    if node.profile in const.PROFILE_TYPES[const.DISCOVER_BINARY_SENSOR]:
-        return 'binary_sensor'
-    if node.profile in const.PROFILE_TYPES[const.DISCOVER_SWITCH]:
-        return 'switch'
-
-    attr_types = [attr.type for attr in node.attributes]
-    if const.COVER_POSITION in attr_types:
-        return 'cover'
+    policy selects the attribute types shown as state attributes, see
+    the attribute policies of the hub. Updates of attributes that are neither shown
+    nor in state_types, the types the state is derived from, do not write
+    the state. state_types None means the state may use any attribute.
+    """
 
-class HomeeDevice(Entity):
-    """Representation of a Homee device entity."""
+    policy = None
+    state_types = None
 
-    def __init__(self, hass, homee_node, cube):
+    def __init__(self, hass, homee_node, hub):
         """Initialize the device."""
         self._homee_node = homee_node
-        self.cube = cube
+        self.hub = hub
+        self.cube = hub.cube
 
         self._name = self._homee_node.name
         # Append device id to prevent name clashes in HA.
@@ -167,37 +258,146 @@ class HomeeDevice(Entity):
         else:
             self.homee_id = HOMEE_ID_FORMAT.format(
                 slugify(self._name), self._homee_node.id)
-        self.attributes = dict()
-        for attribute in homee_node.attributes:
-            attr_type = get_attr_type(attribute)
-            self.attributes[attr_type] = attribute
-
-        self.cube.register(self._homee_node, self._update_callback)
+        if hub.name:
+            # tell the entities of several cubes apart
+            self.homee_id = HOMEE_ID_FORMAT.format(slugify(hub.name), self.homee_id)
+        self._unique_id = HOMEE_DEVICE_ID_FORMAT.format(hub.entry_id, homee_node.id)
+        self._store = hub.dispatcher.get_store(homee_node)
+        self._coalescers = dict()
+        # attribute id -> optimistic copy of the attribute
+        self._optimistic = dict()
+        exposed = hub.attribute_policies.get(self.policy)
+        self._exposed_types = None if exposed is None else frozenset(exposed)
+        if self._exposed_types is None or self.state_types is None:
+            self._relevant_types = None
+        else:
+            self._relevant_types = self._exposed_types.union(self.state_types)
+
+        hub.dispatcher.register(self._homee_node, self._update_callback,
+                                self.subscribed_attribute_ids())
+
+    def subscribed_attribute_ids(self):
+        """Return the attribute ids this entity consumes, None for all."""
+        return None
+
+    async def async_added_to_hass(self):
+        """Catch up with a live node received while the entity was created."""
+        self.hub.entities[self._homee_node.id].append(self)
+        node = self.hub.nodes.get(self._homee_node.id)
+        if node is not None and node is not self._homee_node:
+            self._apply_node(node)
+
+    def _apply_node(self, node):
+        """Take over the node and the values of the consumed attributes."""
+        self._homee_node = node
+        self._store = self.hub.dispatcher.get_store(node)
+        attribute_ids = self.subscribed_attribute_ids()
+        if attribute_ids is None:
+            records = self._store.by_id.values()
+        else:
+            records = [self._store.by_id[attr_id] for attr_id in attribute_ids if attr_id in self._store.by_id]
+        for record in records:
+            # a node update must not overwrite a pending optimistic value either
+            if self._optimistic and not self._take_confirmed(record):
+                continue
+            self.update_state(record)
+
+    def _take_confirmed(self, attribute):
+        """Return whether a reported attribute replaces the shown value.
+
+        While an optimistic value is pending, only the confirming report does.
+        """
+        if attribute.id not in self._optimistic:
+            return True
+        if not self.hub.confirmations.confirm(self._homee_node.id, attribute):
+            return False
+        del self._optimistic[attribute.id]
+        return True
 
     async def _update_callback(self, node, attribute):
         """Update the state."""
         if node is not None:
-            self._homee_node = node
+            self._apply_node(node)
         if attribute is not None:
             attr_type = get_attr_type(attribute)
-            self.attributes[attr_type] = attribute
+            if not self._take_confirmed(attribute):
+                # keep the optimistic value until confirmed or expired
+                if self.hub.metrics is not None:
+                    self.hub.metrics.increment('state_writes_suppressed')
+                return
 
             self.update_state(attribute)
+            if self._relevant_types is not None and attr_type not in self._relevant_types:
+                # neither shown nor used for the state
+                if self.hub.metrics is not None:
+                    self.hub.metrics.increment('state_writes_suppressed')
+                return
+            coalescer = self._get_coalescer(attr_type)
+            if coalescer is not None:
+                written = coalescer.update(attribute.value)
+                if not written and self.hub.metrics is not None:
+                    self.hub.metrics.increment('state_writes_suppressed')
+                return
+        return self._write_state()
+
+    def _write_state(self):
+        """Schedule a state write, counting it for the diagnostics."""
+        if self.hub.metrics is not None:
+            self.hub.metrics.increment('state_writes')
         return self.async_schedule_update_ha_state()
 
+    def _get_coalescer(self, attr_type):
+        """Return the state write coalescer for an attribute type, if configured."""
+        if attr_type not in self.hub.throttle:
+            return None
+        coalescer = self._coalescers.get(attr_type)
+        if coalescer is None:
+            throttle = self.hub.throttle[attr_type]
+            coalescer = StateWriteCoalescer(
+                self._write_state,
+                throttle.get(CONF_INTERVAL, 0), throttle.get(CONF_DEADBAND, 0))
+            self._coalescers[attr_type] = coalescer
+        return coalescer
+
+    async def async_will_remove_from_hass(self):
+        """Unsubscribe and cancel pending state writes and command confirmations."""
+        self.hub.dispatcher.unregister(self._homee_node.id, self._update_callback)
+        if self in self.hub.entities.get(self._homee_node.id, ()):
+            self.hub.entities[self._homee_node.id].remove(self)
+        for coalescer in self._coalescers.values():
+            coalescer.cancel()
+        for attribute in self._optimistic.values():
+            self.hub.confirmations.cancel(self._homee_node.id, attribute.id)
+
     @property
     def name(self):
         """Return the name of the device."""
         return self._name
 
+    @property
+    def unique_id(self):
+        """Return the config entry and node based id of the entity."""
+        return self._unique_id
+
+    @property
+    def device_info(self):
+        """Return the node as device, e.g. for device triggers."""
+        return {
+            'identifiers': {(DOMAIN, HOMEE_DEVICE_ID_FORMAT.format(self.hub.entry_id, self._homee_node.id))},
+            'name': self._homee_node.name,
+            'manufacturer': 'homee',
+            'model': self._homee_node.profile,
+        }
+
     @property
     def should_poll(self):
         return False
 
     @property
     def available(self):
-        from pyhomee.const import CANodeStateAvailable
-        return self._homee_node.state == CANodeStateAvailable
+        if not self.hub.supervisor.connected:
+            return False
+        return is_available(self._homee_node)
 
     def get_attr_value(self, attr_type, default=None):
         attr = self.get_attr(attr_type)
@@ -205,25 +405,143 @@ class HomeeDevice(Entity):
             return default
         return attr.value
 
+    @property
+    def attributes(self):
+        """Return the attributes of the node by type name."""
+        return self._store.by_name
+
     def get_attr(self, attr_type):
-        return self.attributes.get(attr_type)
+        attribute = self._store.by_name.get(attr_type)
+        if self._optimistic and attribute is not None:
+            return self._optimistic.get(attribute.id, attribute)
+        return attribute
 
     def has_attr(self, attr_type):
-        return attr_type in self.attributes
+        return attr_type in self._store.by_name
 
     async def set_attr(self, attr_type, value):
-        await self.cube.send_node_command(self._homee_node, self.get_attr(attr_type), value)
+        await self.send_command(self.get_attr(attr_type), value)
+
+    async def send_command(self, attribute, value):
+        """Send a command for an attribute of the node through the queue."""
+        if self.hub.confirmations is not None and attribute is not None:
+            self._apply_optimistic(attribute, value)
+        await self.hub.commands.async_send(self._homee_node, attribute, value)
+
+    def _apply_optimistic(self, attribute, value):
+        """Show the target value until the cube confirms or the command expires."""
+        optimistic = copy.copy(self._store.by_id.get(attribute.id, attribute))
+        optimistic.value = value
+        self._optimistic[attribute.id] = optimistic
+        self.update_state(optimistic)
+        self.hub.confirmations.track(self._homee_node.id, attribute.id, value,
+                                     lambda: self._rollback(attribute.id))
+        # written right away, a throttle must not delay the feedback of a command
+        self._write_state()
+
+    def _rollback(self, attribute_id):
+        """Restore the last reported value of an unconfirmed attribute."""
+        if self._optimistic.pop(attribute_id, None) is None:
+            return
+        # the attribute may be gone if the node changed meanwhile
+        record = self._store.by_id.get(attribute_id)
+        if record is None:
+            return
+        self.update_state(record)
+        self._write_state()
 
     @property
     def device_state_attributes(self):
         """Return the state attributes of the device."""
-        attr = {}
-        for attr_type, attribute in self.attributes.items():
-            attr[attr_type] = attribute.value
-        if self.has_attr('BatteryLowAlarm'):
-            attr['battery_level'] = 100 if self.get_attr_value('BatteryLowAlarm', 0) == 0 else 0
-
+        attr = self._store.state_attributes(self._exposed_types)
+        if self._optimistic:
+            attr = dict(attr)
+            for attribute in self._optimistic.values():
+                attr_type = get_attr_type(attribute)
+                shown = self._store.by_name.get(attr_type)
+                if shown is not None and shown.id == attribute.id and \
+                        (self._exposed_types is None or attr_type in self._exposed_types):
+                    attr[attr_type] = attribute.value
         return attr
 
     def update_state(self, attribute):
         pass
+
+
+class HomeeGroupDevice(Entity):
+    """Representation of a homee group of nodes of the same platform.
+
+    The state is derived from the attribute stores of the nodes, commands
+    are sent once to the group instead of to every node.
+    """
+
+    # attribute types the state of the group is derived from
+    state_types = ()
+
+    def __init__(self, hass, group, node_ids, hub):
+        """Initialize the group."""
+        self._group = group
+        self._node_ids = list(node_ids)
+        self.hub = hub
+        self._name = urllib.parse.unquote(group.name)
+        self.homee_id = HOMEE_GROUP_ID_FORMAT.format(slugify(self._name), group.id)
+        if hub.name:
+            self.homee_id = HOMEE_ID_FORMAT.format(slugify(hub.name), self.homee_id)
+        for node_id in self._node_ids:
+            node = hub.nodes[node_id]
+            store = hub.dispatcher.get_store(node)
+            hub.dispatcher.register(node, self._update_callback, [
+                record.id for name, record in store.by_name.items() if name in self.state_types])
+
+    async def _update_callback(self, node, attribute):
+        """Update the state."""
+        if self.hub.metrics is not None:
+            self.hub.metrics.increment('state_writes')
+        return self.async_schedule_update_ha_state()
+
+    async def async_will_remove_from_hass(self):
+        """Unsubscribe from the nodes of the group."""
+        for node_id in self._node_ids:
+            self.hub.dispatcher.unregister(node_id, self._update_callback)
+
+    @property
+    def name(self):
+        """Return the name of the group."""
+        return self._name
+
+    @property
+    def unique_id(self):
+        """Return the config entry and group based id of the entity."""
+        return HOMEE_ID_FORMAT.format(self.hub.entry_id, 'group_{}'.format(self._group.id))
+
+    @property
+    def should_poll(self):
+        return False
+
+    @property
+    def available(self):
+        if not self.hub.supervisor.connected:
+            return False
+        return any(is_available(node) for node in self._nodes())
+
+    @property
+    def device_state_attributes(self):
+        """Return the nodes of the group."""
+        return {'node_ids': self._node_ids}
+
+    def _nodes(self):
+        return [self.hub.nodes[node_id] for node_id in self._node_ids if node_id in self.hub.nodes]
+
+    def get_attr_values(self, attr_type):
+        """Return the values of an attribute type of all nodes having it."""
+        values = []
+        for node_id in self._node_ids:
+            store = self.hub.dispatcher.find_store(node_id)
+            record = store.by_name.get(attr_type) if store is not None else None
+            if record is not None:
+                values.append(record.value)
+        return values
+
+    async def send_group_command(self, attr_type, value):
+        """Set an attribute type on all nodes of the group with one command."""
+        await self.hub.commands.async_send_group(self._group, get_attr_type_id(attr_type), value)
@@ -7,25 +7,28 @@ https://home-assistant.io/components/binary_sensor.homee/
 import asyncio
 import logging
 from homeassistant.components.binary_sensor import BinarySensorDevice
-from custom_components.homee import HOMEE_CUBE, HomeeDevice
+from custom_components.homee import DOMAIN, HomeeDevice
 
 _LOGGER = logging.getLogger(__name__)
 
 DEPENDENCIES = ['homee']
 
 
-async def async_setup_platform(hass, config, async_add_devices, discovery_info=None):
-    """Perform the setup for Vera controller devices."""
-    devices = []
-    for data in discovery_info['devices']:
-        devices.append(HomeeBinarySensor(hass, data['node'], HOMEE_CUBE))
-    async_add_devices(devices)
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Add the binary sensors discovered by the hub of a cube."""
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
+    def add_devices(discovered):
+        async_add_entities([HomeeBinarySensor(hass, data['node'], hub) for data in discovered])
+    hub.register_platform('binary_sensor', add_devices)
 
 
 class HomeeBinarySensor(HomeeDevice, BinarySensorDevice):
+    policy = 'binary_sensor'
+    state_types = ('OpenClose',)
 
-    def __init__(self, hass, homee_node, cube):
-        HomeeDevice.__init__(self, hass, homee_node, cube)
+    def __init__(self, hass, homee_node, hub):
+        HomeeDevice.__init__(self, hass, homee_node, hub)
 
     @property
     def is_on(self):
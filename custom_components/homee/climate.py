@@ -11,7 +11,7 @@ from typing import List
 from homeassistant.components.climate import ClimateDevice, ENTITY_ID_FORMAT
 from homeassistant.components.climate.const import SUPPORT_TARGET_TEMPERATURE, SUPPORT_PRESET_MODE, CURRENT_HVAC_HEAT, \
     CURRENT_HVAC_COOL, CURRENT_HVAC_OFF
-from custom_components.homee import HOMEE_CUBE, HomeeDevice
+from custom_components.homee import DOMAIN, HomeeDevice
 from homeassistant.const import TEMP_CELSIUS, ATTR_TEMPERATURE
 
 DEPENDENCIES = ['homee']
@@ -19,15 +19,19 @@ DEPENDENCIES = ['homee']
 _LOGGER = logging.getLogger(__name__)
 
 
-async def async_setup_platform(hass, config, async_add_devices, discovery_info=None):
-    """Perform the setup for Vera controller devices."""
-    devices = []
-    for data in discovery_info['devices']:
-        devices.append(HomeeThermostat(hass, data['node'], HOMEE_CUBE))
-    async_add_devices(devices)
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Add the thermostats discovered by the hub of a cube."""
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
+    def add_devices(discovered):
+        async_add_entities([HomeeThermostat(hass, data['node'], hub) for data in discovered])
+    hub.register_platform('climate', add_devices)
 
 
 class HomeeThermostat(HomeeDevice, ClimateDevice):
+    policy = 'climate'
+    state_types = ('Temperature', 'TargetTemperature', 'RelativeHumidity', 'CurrentValvePosition')
+
     @property
     def supported_features(self):
         """Return the list of supported features."""
@@ -77,8 +81,8 @@ class HomeeThermostat(HomeeDevice, ClimateDevice):
     def hvac_modes(self) -> List[str]:
         return [CURRENT_HVAC_OFF, CURRENT_HVAC_COOL, CURRENT_HVAC_HEAT]
 
-    def __init__(self, hass, homee_node, cube):
-        HomeeDevice.__init__(self, hass, homee_node, cube)
+    def __init__(self, hass, homee_node, hub):
+        HomeeDevice.__init__(self, hass, homee_node, hub)
         self.entity_id = ENTITY_ID_FORMAT.format(self.homee_id)
 
     def update_state(self, attribute):
@@ -88,4 +92,4 @@ class HomeeThermostat(HomeeDevice, ClimateDevice):
         temperature = kwargs.get(ATTR_TEMPERATURE)
         if temperature is None:
             return None
-        await self.cube.send_node_command(self._homee_node, self.get_attr('TargetTemperature'), temperature)
+        await self.send_command(self.get_attr('TargetTemperature'), temperature)
@@ -0,0 +1,112 @@
+"""Queue for node commands sent to the homee cube."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+_LOGGER = logging.getLogger(__name__)
+
+# sets an attribute type on all nodes of a group
+GROUP_COMMAND = 'PUT:groups/{}/attributes?target_value={}&attribute_type={}'
+# seconds after a command during which further values of the same key are merged
+COALESCE_INTERVAL = 0.1
+
+
+class HomeeCommandQueue:
+    """Send node commands concurrently, merging superseded values.
+
+    The first command for a (node, attribute) or (group, attribute type) is
+    sent right away. Values queued for the same key while it is being sent
+    and during the following COALESCE_INTERVAL are merged, so e.g. a
+    dragged slider sends its first and then at most one value per interval.
+    At most max_in_flight commands are sent at the same time.
+    """
+
+    def __init__(self, cube, max_in_flight, metrics=None):
+        self.cube = cube
+        self.metrics = metrics
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        # key -> [send coroutine function, node_id, value, waiting futures]
+        self._pending = OrderedDict()
+        # keys sent within the last COALESCE_INTERVAL
+        self._active = set()
+        # (node_id, attribute_id) -> time the last command was sent, with metrics
+        self._sent = {}
+
+    @property
+    def pending(self):
+        """Return the number of commands waiting to be sent."""
+        return len(self._pending)
+
+    async def async_send(self, node, attribute, value):
+        """Queue a command and wait until it has been sent."""
+        def send(value):
+            return self.cube.send_node_command(node, attribute, value)
+        await self._async_queue((node.id, attribute.id), send, node.id, value)
+
+    async def async_send_group(self, group, attribute_type, value):
+        """Queue a command for an attribute type of all nodes of a group."""
+        def send(value):
+            return self.cube.registry.send_command(
+                GROUP_COMMAND.format(group.id, value, attribute_type))
+        await self._async_queue(('group', group.id, attribute_type), send, None, value)
+
+    async def _async_queue(self, key, send, node_id, value):
+        future = asyncio.get_event_loop().create_future()
+        entry = self._pending.get(key)
+        if entry is not None:
+            _LOGGER.debug("Merging command for %s with pending one", key)
+            entry[2] = value
+            entry[3].append(future)
+        else:
+            self._pending[key] = [send, node_id, value, [future]]
+            if key not in self._active:
+                asyncio.ensure_future(self._async_process(key))
+        await future
+
+    def acknowledge(self, node_id, attribute_id):
+        """Record the round trip of a command once the cube reports the attribute."""
+        start = self._sent.pop((node_id, attribute_id), None)
+        if start is not None:
+            self.metrics.observe_node('command_latency', node_id, time.monotonic() - start)
+
+    async def async_send_batch(self, commands):
+        """Send (node, attribute, value) commands concurrently."""
+        await asyncio.gather(*[
+            self.async_send(node, attribute, value) for node, attribute, value in commands
+        ])
+
+    async def _async_process(self, key):
+        self._active.add(key)
+        try:
+            while key in self._pending:
+                async with self._semaphore:
+                    await self._async_send_pending(key)
+                await asyncio.sleep(COALESCE_INTERVAL)
+        finally:
+            self._active.discard(key)
+
+    async def _async_send_pending(self, key):
+        send, node_id, value, futures = self._pending.pop(key)
+        self.in_flight += 1
+        start = time.monotonic() if self.metrics is not None else None
+        try:
+            await send(value)
+        except Exception as err:  # pylint: disable=broad-except
+            for future in futures:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        finally:
+            self.in_flight -= 1
+        if self.metrics is not None:
+            # the round trip ends with the attribute update, see acknowledge
+            if node_id is None:
+                self.metrics.observe('group_command_send', time.monotonic() - start)
+            else:
+                self._sent[key] = start
+            self.metrics.increment('commands_merged', len(futures) - 1)
+        for future in futures:
+            if not future.done():
+                future.set_result(None)
@@ -0,0 +1,69 @@
+"""Config flow for the homee integration."""
+import logging
+
+import voluptuous as vol
+
+from homeassistant import config_entries
+
+from .const import CONF_CUBE, CONF_NAME, CONF_PASSWORD, CONF_USERNAME, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@config_entries.HANDLERS.register(DOMAIN)
+class HomeeFlowHandler(config_entries.ConfigFlow):
+    """Set up a homee cube, one config entry per cube."""
+
+    VERSION = 1
+    CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_PUSH
+
+    def _entry_for(self, cube):
+        for entry in self.hass.config_entries.async_entries(DOMAIN):
+            if entry.data.get(CONF_CUBE) == cube:
+                return entry
+        return None
+
+    async def async_step_user(self, user_input=None):
+        """Ask for the address and the credentials of a cube."""
+        errors = {}
+        if user_input is not None:
+            if self._entry_for(user_input[CONF_CUBE]) is not None:
+                return self.async_abort(reason='already_configured')
+            if await self._async_validate(user_input):
+                return self.async_create_entry(title=self._title(user_input), data=user_input)
+            errors['base'] = 'cannot_connect'
+        return self.async_show_form(step_id='user', errors=errors, data_schema=vol.Schema({
+            vol.Required(CONF_CUBE): str,
+            vol.Required(CONF_USERNAME): str,
+            vol.Required(CONF_PASSWORD): str,
+            vol.Optional(CONF_NAME): str,
+        }))
+
+    async def async_step_import(self, import_config):
+        """Take over a cube configured in configuration.yaml."""
+        entry = self._entry_for(import_config[CONF_CUBE])
+        if entry is not None:
+            # the yaml configuration stays authoritative
+            if dict(entry.data) != import_config:
+                self.hass.config_entries.async_update_entry(entry, data=import_config)
+                self.hass.async_create_task(
+                    self.hass.config_entries.async_reload(entry.entry_id))
+            return self.async_abort(reason='already_configured')
+        return self.async_create_entry(title=self._title(import_config), data=import_config)
+
+    async def _async_validate(self, user_input):
+        """Return whether a token can be retrieved with the credentials."""
+        from pyhomee import HomeeCube
+        cube = HomeeCube(user_input[CONF_CUBE], user_input[CONF_USERNAME], user_input[CONF_PASSWORD])
+        try:
+            await cube.get_token()
+            return True
+        except Exception as err:  # pyhomee raises plain exceptions
+            _LOGGER.warning("Unable to connect to homee %s: %s", user_input[CONF_CUBE], err)
+            return False
+        finally:
+            await cube.session.close()
+
+    @staticmethod
+    def _title(config):
+        return config.get(CONF_NAME) or config[CONF_CUBE]
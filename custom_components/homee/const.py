@@ -0,0 +1,87 @@
+"""Constants of the homee integration."""
+
+DOMAIN = 'homee'
+
+CONF_CUBE = 'cube'
+CONF_USERNAME = 'username'
+CONF_PASSWORD = 'password'
+CONF_NAME = 'name'
+CONF_THROTTLE = 'throttle'
+CONF_INTERVAL = 'interval'
+CONF_DEADBAND = 'deadband'
+CONF_BUFFER = 'buffer'
+CONF_SIZE = 'size'
+CONF_AGGREGATE = 'aggregate'
+CONF_SNAPSHOT = 'snapshot'
+CONF_MAX_IN_FLIGHT = 'max_in_flight'
+CONF_OPTIMISTIC = 'optimistic'
+CONF_OPTIMISTIC_TIMEOUT = 'optimistic_timeout'
+CONF_DIAGNOSTICS = 'diagnostics'
+CONF_DIAGNOSTICS_ATTRIBUTES = 'diagnostics_attributes'
+CONF_FILTER = 'filter'
+CONF_STATE_ATTRIBUTES = 'state_attributes'
+CONF_GROUPS = 'groups'
+CONF_HOMEEGRAMS = 'homeegrams'
+CONF_EVENTS = 'events'
+CONF_RECORD = 'record'
+CONF_PATH = 'path'
+CONF_MAX_BYTES = 'max_bytes'
+CONF_BACKUPS = 'backups'
+CONF_RELAY = 'relay'
+CONF_HOST = 'host'
+CONF_PORT = 'port'
+CONF_QUEUE_SIZE = 'queue_size'
+POLICY_ALL = 'all'
+CONF_INCLUDE_NODES = 'include_nodes'
+CONF_EXCLUDE_NODES = 'exclude_nodes'
+CONF_INCLUDE_PROFILES = 'include_profiles'
+CONF_EXCLUDE_PROFILES = 'exclude_profiles'
+CONF_INCLUDE_GROUPS = 'include_groups'
+CONF_EXCLUDE_GROUPS = 'exclude_groups'
+CONF_INCLUDE_ATTRIBUTE_TYPES = 'include_attribute_types'
+CONF_EXCLUDE_ATTRIBUTE_TYPES = 'exclude_attribute_types'
+
+EVENT_DIAGNOSTICS = 'homee_diagnostics'
+EVENT_SERIES = 'homee_series'
+EVENT_ATTRIBUTE_CHANGED = 'homee_attribute_changed'
+EVENT_REPLAY = 'homee_replay'
+
+HOMEE_ID_FORMAT = '{}_{}'
+HOMEE_GROUP_ID_FORMAT = 'homee_group_{}_{}'
+# device registry identifier of a node: config entry id, node id
+HOMEE_DEVICE_ID_FORMAT = '{}_{}'
+
+HOMEE_IMPORT_GROUP = 'HASS'
+
+# policy -> attribute type names shown as state attributes, None for all
+DEFAULT_ATTRIBUTE_POLICIES = {
+    'light': ['OnOff', 'DimmingLevel', 'Color', 'ColorTemperature', 'ColorMode'],
+    'switch': ['OnOff'],
+    'climate': ['Temperature', 'TargetTemperature', 'CurrentValvePosition', 'BatteryLowAlarm'],
+    'binary_sensor': ['OpenClose', 'BatteryLowAlarm', 'TamperAlarm'],
+    'cover': ['Position', 'UpDown', 'BatteryLowAlarm'],
+    'cube': ['HomeeMode'],
+}
+
+# attributes that are not added as sensors
+DISCOVER_SENSOR_ATTRIBUTES = [
+    'DimmingLevel',
+    'OnOff',
+    'Color',
+    'OpenClose',
+    'Temperature',
+    'TargetTemperature',
+    'BatteryLowAlarm',
+    'LinkQuality',
+    'IdentificationMode',
+    'SoftwareRevision'
+]
+
+# seconds to wait for further nodes before adding the discovered devices
+DISCOVERY_DEBOUNCE = 0.5
+DISCOVERY_MAX_DELAY = 5
+# devices a platform turns into entities before yielding to the event loop
+DISCOVERY_CHUNK_SIZE = 50
+
+# platforms supporting homee groups of their nodes
+GROUP_COMPONENTS = ['light', 'switch', 'cover']
@@ -8,29 +8,42 @@ import logging
 
 from homeassistant.components.cover import (
     CoverDevice, ENTITY_ID_FORMAT)
-from custom_components.homee import (
-    HOMEE_NODES, HOMEE_ATTRIBUTES, HOMEE_CUBE, HomeeDevice)
+from custom_components.homee import DOMAIN, HomeeDevice, HomeeGroupDevice
 
 DEPENDENCIES = ['homee']
 
 _LOGGER = logging.getLogger(__name__)
 
 
-async def async_setup_platform(hass, config, async_add_devices, discovery_info=None):
-    """Perform the setup for Vera controller devices."""
-    devices = []
-    for attribute in HOMEE_ATTRIBUTES['cover']:
-        devices.append(HomeeCover(hass, HOMEE_NODES[attribute.node_id], attribute, HOMEE_CUBE))
-    async_add_devices(devices)
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Add the covers discovered by the hub of a cube."""
+    from pyhomee.const import COVER_POSITION
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
+    def add_devices(discovered):
+        devices = []
+        for data in discovered:
+            if 'group' in data:
+                devices.append(HomeeGroupCover(hass, data['group'], data['node_ids'], hub))
+            else:
+                node = data['node']
+                position = hub.dispatcher.get_store(node).get_by_type(COVER_POSITION)
+                devices.append(HomeeCover(hass, node, position, hub))
+        async_add_entities(devices)
+    hub.register_platform('cover', add_devices)
 
 class HomeeCover(HomeeDevice, CoverDevice):
     """Representation of a Homee Cover."""
 
-    def __init__(self, homee_node, homee_attribute, cube):
+    policy = 'cover'
+    state_types = ('Position',)
+
+    def __init__(self, hass, homee_node, homee_attribute, hub):
         """Initialize the cover."""
+        self.homee_attribute = homee_attribute
         self.attribute_id = homee_attribute.id
         self.position = homee_attribute.value
-        HomeeDevice.__init__(self, hass, homee_node, cube)
+        HomeeDevice.__init__(self, hass, homee_node, hub)
         self.entity_id = ENTITY_ID_FORMAT.format(self.homee_id)
         self.update_state(homee_attribute)
 
@@ -55,7 +68,7 @@ class HomeeCover(HomeeDevice, CoverDevice):
 
     async def async_set_cover_position(self, position, **kwargs):
         """Move the cover to a specific position."""
-        await self.cube.send_node_command(self._homee_node, self.homee_attribute, position)
+        await self.send_command(self.homee_attribute, position)
 
     @property
     def is_closed(self):
@@ -68,12 +81,51 @@ class HomeeCover(HomeeDevice, CoverDevice):
 
     async def async_open_cover(self, **kwargs):
         """Open the cover."""
-        await self.cube.send_node_command(self._homee_node, self.homee_attribute, 0)
+        await self.send_command(self.homee_attribute, 0)
 
     async def async_close_cover(self, **kwargs):
         """Close the cover."""
-        await self.cube.send_node_command(self._homee_node, self.homee_attribute, 100)
+        await self.send_command(self.homee_attribute, 100)
 
     def stop_cover(self, **kwargs):
         """Stop the cover."""
         pass
+
+
+class HomeeGroupCover(HomeeGroupDevice, CoverDevice):
+    """Representation of a homee group of covers."""
+
+    state_types = ('Position',)
+
+    def __init__(self, hass, group, node_ids, hub):
+        """Initialize the cover group."""
+        HomeeGroupDevice.__init__(self, hass, group, node_ids, hub)
+        self.entity_id = ENTITY_ID_FORMAT.format(self.homee_id)
+
+    @property
+    def current_cover_position(self):
+        """Return the mean position of the covers, 0 is closed, 100 is fully open."""
+        positions = self.get_attr_values('Position')
+        if not positions:
+            return None
+        return 100 - sum(positions) / len(positions)
+
+    async def async_set_cover_position(self, position, **kwargs):
+        """Move the covers to a specific position."""
+        await self.send_group_command('Position', position)
+
+    @property
+    def is_closed(self):
+        """Return if all covers are closed."""
+        position = self.current_cover_position
+        if position is None:
+            return None
+        return position <= 5
+
+    async def async_open_cover(self, **kwargs):
+        """Open the covers."""
+        await self.send_group_command('Position', 0)
+
+    async def async_close_cover(self, **kwargs):
+        """Close the covers."""
+        await self.send_group_command('Position', 100)
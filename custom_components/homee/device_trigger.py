@@ -0,0 +1,72 @@
+"""Device triggers for homee attribute events."""
+import voluptuous as vol
+
+from homeassistant.components.automation import event as event_trigger
+from homeassistant.components.device_automation import TRIGGER_BASE_SCHEMA
+from homeassistant.const import CONF_DEVICE_ID, CONF_DOMAIN, CONF_PLATFORM, CONF_TYPE
+from homeassistant.helpers import config_validation as cv
+
+from .const import DOMAIN, EVENT_ATTRIBUTE_CHANGED
+from .util import get_attr_type
+
+CONF_ATTRIBUTE_ID = 'attribute_id'
+CONF_VALUE = 'value'
+
+TRIGGER_SCHEMA = TRIGGER_BASE_SCHEMA.extend({
+    # attribute type name, e.g. ButtonState
+    vol.Required(CONF_TYPE): cv.string,
+    vol.Optional(CONF_ATTRIBUTE_ID): vol.Coerce(int),
+    # only trigger for this value
+    vol.Optional(CONF_VALUE): vol.Coerce(float),
+})
+
+
+async def _async_get_node(hass, device_id):
+    """Return the config entry id and node id of a device."""
+    registry = await hass.helpers.device_registry.async_get_registry()
+    device = registry.async_get(device_id)
+    if device is None:
+        return None, None
+    for domain, identifier in device.identifiers:
+        if domain == DOMAIN:
+            entry_id, node_id = identifier.rsplit('_', 1)
+            return entry_id, int(node_id)
+    return None, None
+
+
+async def async_get_triggers(hass, device_id):
+    """Return a trigger per attribute of the node fired as event."""
+    entry_id, node_id = await _async_get_node(hass, device_id)
+    hub = hass.data.get(DOMAIN, {}).get(entry_id)
+    node = hub.nodes.get(node_id) if hub is not None else None
+    if node is None:
+        return []
+    return [{
+        CONF_PLATFORM: 'device',
+        CONF_DEVICE_ID: device_id,
+        CONF_DOMAIN: DOMAIN,
+        CONF_TYPE: get_attr_type(attribute),
+        CONF_ATTRIBUTE_ID: attribute.id,
+    } for attribute in node.attributes if attribute.type in hub.event_types]
+
+
+async def async_get_trigger_capabilities(hass, config):
+    """Allow to restrict a trigger to a value."""
+    return {'extra_fields': vol.Schema({vol.Optional(CONF_VALUE): vol.Coerce(float)})}
+
+
+async def async_attach_trigger(hass, config, action, automation_info):
+    """Listen for the homee_attribute_changed events of the node."""
+    config = TRIGGER_SCHEMA(config)
+    entry_id, node_id = await _async_get_node(hass, config[CONF_DEVICE_ID])
+    event_data = {'entry_id': entry_id, 'node_id': node_id, 'type': config[CONF_TYPE]}
+    for key in (CONF_ATTRIBUTE_ID, CONF_VALUE):
+        if key in config:
+            event_data[key] = config[key]
+    event_config = event_trigger.TRIGGER_SCHEMA({
+        event_trigger.CONF_PLATFORM: 'event',
+        event_trigger.CONF_EVENT_TYPE: EVENT_ATTRIBUTE_CHANGED,
+        event_trigger.CONF_EVENT_DATA: event_data,
+    })
+    return await event_trigger.async_attach_trigger(
+        hass, event_config, action, automation_info, platform_type='device')
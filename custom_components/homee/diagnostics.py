@@ -0,0 +1,91 @@
+"""Low overhead instrumentation of the homee integration."""
+import time
+from collections import defaultdict
+
+# seconds over which the message rate is calculated
+RATE_WINDOW = 10
+
+
+class Histogram:
+    """Latency histogram with fixed buckets in milliseconds."""
+
+    BOUNDS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def observe(self, seconds):
+        millis = seconds * 1000
+        for idx, bound in enumerate(self.BOUNDS_MS):
+            if millis <= bound:
+                break
+        else:
+            idx = len(self.BOUNDS_MS)
+        self.counts[idx] += 1
+        self.count += 1
+        self.total += millis
+        if millis > self.max:
+            self.max = millis
+
+    def as_dict(self):
+        buckets = {'<={}ms'.format(bound): count for bound, count in zip(self.BOUNDS_MS, self.counts)}
+        buckets['>{}ms'.format(self.BOUNDS_MS[-1])] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 3) if self.count else None,
+            'max_ms': round(self.max, 3),
+            'buckets': buckets,
+        }
+
+
+class HomeeMetrics:
+    """Counters and histograms of the hot paths.
+
+    Only created when diagnostics are enabled, callers check for None so
+    disabled instrumentation costs a single comparison.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counters = defaultdict(int)
+        self.histograms = defaultdict(Histogram)
+        # name -> node id -> histogram
+        self.node_histograms = defaultdict(lambda: defaultdict(Histogram))
+        self._window_start = self.started
+        self._window_messages = 0
+        self.messages_per_second = 0
+
+    def message_received(self):
+        self.counters['messages_received'] += 1
+        self._window_messages += 1
+        now = time.monotonic()
+        if now - self._window_start >= RATE_WINDOW:
+            self.messages_per_second = self._window_messages / (now - self._window_start)
+            self._window_start = now
+            self._window_messages = 0
+
+    def increment(self, name, value=1):
+        self.counters[name] += value
+
+    def observe(self, name, seconds):
+        self.histograms[name].observe(seconds)
+
+    def observe_node(self, name, node_id, seconds):
+        self.node_histograms[name][node_id].observe(seconds)
+
+    def as_dict(self):
+        return {
+            'uptime': round(time.monotonic() - self.started),
+            'messages_per_second': round(self.messages_per_second, 2),
+            'counters': dict(self.counters),
+            'histograms': {name: hist.as_dict() for name, hist in self.histograms.items()},
+            'per_node': {
+                name: {node_id: hist.as_dict() for node_id, hist in nodes.items()}
+                for name, nodes in self.node_histograms.items()
+            },
+        }
@@ -0,0 +1,175 @@
+"""Routing of websocket updates to the homee entities."""
+import logging
+import time
+from collections import defaultdict
+
+from .util import NodeAttributeStore
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HomeeDispatcher:
+    """Route websocket updates to the entities consuming them.
+
+    pyhomee calls every callback registered for a node on each attribute
+    update. Instead, a single callback per node is registered with the cube
+    and attribute updates are routed by (node_id, attribute_id), so only
+    the entities using that attribute are woken up. Node updates are diffed
+    against the known node: changed attribute values are dispatched as
+    attribute updates, changes of the node itself go to every entity of the
+    node. The dispatcher also owns the attribute stores of the nodes.
+
+    A failing entity callback is logged and does not keep the update from
+    the other entities.
+
+    Attribute updates of the types in event_types are passed to on_event
+    with the previous value before any entity sees them, even if the value
+    did not change.
+    """
+
+    def __init__(self, cube, metrics=None, event_types=None, on_event=None):
+        self.cube = cube
+        self.metrics = metrics
+        self.event_types = event_types
+        self._on_event = on_event
+        # called with node_id and attribute_id on every attribute update,
+        # set to time command round trips
+        self.acknowledge = None
+        # node_id -> attribute store, shared by the entities of the node
+        self.stores = {}
+        # node_id -> callbacks interested in every attribute of the node
+        self._node_callbacks = defaultdict(list)
+        # (node_id, attribute_id) -> callbacks interested in that attribute
+        self._attribute_callbacks = defaultdict(list)
+        # node_id -> keys of _attribute_callbacks of the node
+        self._attribute_keys = defaultdict(set)
+        # node_id -> all callbacks of the node, for node level updates
+        self._all_callbacks = defaultdict(list)
+        self._subscribed = set()
+
+    def track_node(self, node):
+        """Subscribe to a node and keep its attribute store up to date."""
+        if node.id not in self._subscribed:
+            self.cube.register(node, self._create_node_callback(node.id))
+            self._subscribed.add(node.id)
+        self.get_store(node)
+
+    def untrack_node(self, node_id):
+        """Forget a removed node and its callbacks."""
+        self.stores.pop(node_id, None)
+        self._subscribed.discard(node_id)
+        self._node_callbacks.pop(node_id, None)
+        self._all_callbacks.pop(node_id, None)
+        for key in self._attribute_keys.pop(node_id, ()):
+            self._attribute_callbacks.pop(key, None)
+
+    def get_store(self, node):
+        """Return the attribute store of a node, creating it if necessary."""
+        store = self.stores.get(node.id)
+        if store is None:
+            store = self.stores[node.id] = NodeAttributeStore(node)
+        return store
+
+    def find_store(self, node_id):
+        """Return the attribute store of a node id, None if unknown."""
+        return self.stores.get(node_id)
+
+    def register(self, node, update_callback, attribute_ids=None):
+        """Register an entity callback for a node.
+
+        If attribute_ids is None the callback receives every attribute
+        update of the node, otherwise only updates of the given attributes.
+        """
+        if node.id not in self._subscribed:
+            self.track_node(node)
+        self._all_callbacks[node.id].append(update_callback)
+        if attribute_ids is None:
+            self._node_callbacks[node.id].append(update_callback)
+        else:
+            for attribute_id in attribute_ids:
+                self._attribute_callbacks[(node.id, attribute_id)].append(update_callback)
+                self._attribute_keys[node.id].add((node.id, attribute_id))
+
+    def unregister(self, node_id, update_callback):
+        """Remove an entity callback."""
+        for callbacks in (self._all_callbacks.get(node_id), self._node_callbacks.get(node_id)):
+            if callbacks and update_callback in callbacks:
+                callbacks.remove(update_callback)
+        keys = self._attribute_keys.get(node_id)
+        if not keys:
+            return
+        for key in list(keys):
+            callbacks = self._attribute_callbacks.get(key)
+            if callbacks and update_callback in callbacks:
+                callbacks.remove(update_callback)
+            if not callbacks:
+                self._attribute_callbacks.pop(key, None)
+                keys.discard(key)
+        if not keys:
+            del self._attribute_keys[node_id]
+
+    async def async_refresh_all(self):
+        """Let every entity write its state, e.g. after the connection changed."""
+        for callbacks in list(self._all_callbacks.values()):
+            for update_callback in list(callbacks):
+                await self._async_call(update_callback, None, None)
+
+    @staticmethod
+    async def _async_call(update_callback, node, attribute):
+        try:
+            await update_callback(node, attribute)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Error updating homee entity")
+
+    def _create_node_callback(self, node_id):
+        async def node_callback(node, attribute):
+            await self.async_dispatch(node_id, node, attribute)
+        return node_callback
+
+    async def async_dispatch(self, node_id, node, attribute):
+        """Deliver a node or attribute update to the subscribed entities."""
+        if attribute is not None:
+            await self._async_dispatch_attribute(node_id, attribute)
+        elif node is not None and node_id in self._subscribed:
+            await self._async_dispatch_node(node)
+        else:
+            for update_callback in list(self._all_callbacks.get(node_id, ())):
+                await self._async_call(update_callback, node, attribute)
+
+    async def _async_dispatch_attribute(self, node_id, attribute):
+        if self.metrics is not None:
+            start = time.monotonic()
+            await self._async_deliver_attribute(node_id, attribute)
+            self.metrics.observe('dispatch', time.monotonic() - start)
+        else:
+            await self._async_deliver_attribute(node_id, attribute)
+
+    async def _async_deliver_attribute(self, node_id, attribute):
+        store = self.stores.get(node_id)
+        if self.event_types and attribute.type in self.event_types:
+            record = store.by_id.get(attribute.id) if store is not None else None
+            self._on_event(node_id, attribute, record.value if record is not None else None)
+        if store is not None:
+            store.set_value(attribute.id, attribute.value)
+        if self.acknowledge is not None:
+            self.acknowledge(node_id, attribute.id)
+        callbacks = self._node_callbacks.get(node_id, []) + \
+            self._attribute_callbacks.get((node_id, attribute.id), [])
+        for update_callback in callbacks:
+            await self._async_call(update_callback, None, attribute)
+
+    async def _async_dispatch_node(self, node):
+        store = self.get_store(node)
+        previous = store.node
+        changed = store.update_node(node)
+        if changed is None or previous.state != node.state or previous.profile != node.profile:
+            for update_callback in list(self._all_callbacks.get(node.id, ())):
+                await self._async_call(update_callback, node, None)
+            return
+        for record in changed:
+            if self.acknowledge is not None:
+                self.acknowledge(node.id, record.id)
+            callbacks = self._node_callbacks.get(node.id, []) + \
+                self._attribute_callbacks.get((node.id, record.id), [])
+            for update_callback in callbacks:
+                await self._async_call(update_callback, None, record)
@@ -0,0 +1,47 @@
+"""Filters deciding which homee nodes and attributes become entities."""
+
+
+class DiscoveryFilter:
+    """Include and exclude nodes by id, profile and group, sensors by attribute type.
+
+    An empty include list includes everything, exclusions win over
+    inclusions.
+    """
+
+    def __init__(self, include_nodes=(), exclude_nodes=(), include_profiles=(),
+                 exclude_profiles=(), include_groups=(), exclude_groups=(),
+                 include_attribute_types=(), exclude_attribute_types=()):
+        self.include_nodes = set(include_nodes)
+        self.exclude_nodes = set(exclude_nodes)
+        self.include_profiles = set(include_profiles)
+        self.exclude_profiles = set(exclude_profiles)
+        self.include_groups = set(include_groups)
+        self.exclude_groups = set(exclude_groups)
+        self.include_attribute_types = set(include_attribute_types)
+        self.exclude_attribute_types = set(exclude_attribute_types)
+
+    def node_allowed(self, node, groups):
+        """Return whether entities are created for a node in the given group names."""
+        if node.id in self.exclude_nodes or node.profile in self.exclude_profiles:
+            return False
+        if self.exclude_groups & groups:
+            return False
+        if self.include_nodes and node.id not in self.include_nodes:
+            return False
+        if self.include_profiles and node.profile not in self.include_profiles:
+            return False
+        if self.include_groups and not self.include_groups & groups:
+            return False
+        return True
+
+    def group_allowed(self, name):
+        """Return whether a group of the given name may become an entity."""
+        if name in self.exclude_groups:
+            return False
+        return not self.include_groups or name in self.include_groups
+
+    def attribute_allowed(self, attr_type):
+        """Return whether a sensor is created for an attribute type name."""
+        if attr_type in self.exclude_attribute_types:
+            return False
+        return not self.include_attribute_types or attr_type in self.include_attribute_types
@@ -0,0 +1,176 @@
+"""Import of the attribute history of the cube into the recorder."""
+import asyncio
+import json
+import logging
+import time
+from datetime import timezone
+
+from .util import get_attr_type
+
+_LOGGER = logging.getLogger(__name__)
+
+# high-water marks of the imported attributes, one store per config entry
+HISTORY_KEY = 'homee.history.{}'
+HISTORY_VERSION = 1
+# values requested from the cube per page
+HISTORY_PAGE_SIZE = 1000
+# seconds to wait for a page of the cube
+HISTORY_TIMEOUT = 30
+HOUR = 3600
+
+# attribute types which are meter readings, imported as last reading instead of mean
+TOTAL_TYPES = ['AccumulatedEnergyUse', 'TotalAccumulatedEnergyUse', 'AccumulatedWaterUse']
+
+
+def hourly_states(values, total=False):
+    """Aggregate (timestamp, value) pairs, oldest first, to one state per hour.
+
+    Returns (timestamp, state) pairs: the mean of the hour at its start, or
+    for meter readings the last reading of the hour at its time, as the
+    sensor itself would have shown it.
+    """
+    hours = {}
+    for timestamp, value in values:
+        hours.setdefault(int(timestamp // HOUR * HOUR), []).append((timestamp, value))
+    states = []
+    for start in sorted(hours):
+        hour = hours[start]
+        if total:
+            states.append(hour[-1])
+        else:
+            states.append((start, round(sum(value for _, value in hour) / len(hour), 3)))
+    return states
+
+
+def write_states(hass, entity_id, attributes, states):
+    """Write hourly states of an entity into the recorder's states table.
+
+    Hours in which the recorder already has a state of the entity, e.g.
+    while Home Assistant was running, are skipped. Returns the number of
+    states written. Blocking, run in the executor.
+    """
+    from homeassistant.components.recorder.models import States
+    from homeassistant.components.recorder.util import session_scope
+    from homeassistant.util.dt import utc_from_timestamp
+
+    if not states:
+        return 0
+    first = utc_from_timestamp(states[0][0] // HOUR * HOUR)
+    last = utc_from_timestamp(states[-1][0] // HOUR * HOUR + HOUR)
+    attributes = json.dumps(attributes)
+    with session_scope(hass=hass) as session:
+        recorded = set()
+        for last_updated, in session.query(States.last_updated).filter(
+                (States.entity_id == entity_id) & (States.last_updated >= first) &
+                (States.last_updated < last)):
+            if last_updated.tzinfo is None:
+                # sqlite returns the stored UTC times without time zone
+                last_updated = last_updated.replace(tzinfo=timezone.utc)
+            recorded.add(int(last_updated.timestamp()) // HOUR * HOUR)
+        rows = []
+        for timestamp, state in states:
+            if int(timestamp) // HOUR * HOUR in recorded:
+                continue
+            when = utc_from_timestamp(timestamp)
+            rows.append(States(domain=entity_id.split('.')[0], entity_id=entity_id, state=str(state),
+                               attributes=attributes, last_changed=when, last_updated=when))
+        session.bulk_save_objects(rows)
+    return len(rows)
+
+
+class HistoryImporter:
+    """Stream the history of sensor attributes from the cube into the recorder.
+
+    The history is requested in pages of HISTORY_PAGE_SIZE values. The
+    complete hours of each page are aggregated to one state per hour and
+    written to the recorder in one batch, then the high-water mark of the
+    attribute, the end of the last written hour, is saved. An interrupted
+    import resumes from there.
+    """
+
+    def __init__(self, hass, entry_id, supervisor):
+        from homeassistant.helpers.storage import Store
+        self.hass = hass
+        self.supervisor = supervisor
+        self._store = Store(hass, HISTORY_VERSION, HISTORY_KEY.format(entry_id))
+        self._marks = None
+        # (node id, attribute id) -> future of the requested page
+        self._requests = {}
+
+    def handle(self, data):
+        """Resolve the request of a history message of the cube."""
+        future = self._requests.get((data.get('node_id'), data.get('attribute_id')))
+        if future is not None and not future.done():
+            future.set_result(data)
+
+    async def async_import(self, entity, days):
+        """Import the history of a sensor since its high-water mark.
+
+        Without a mark, the last days are imported. Returns the number of
+        hours written.
+        """
+        from homeassistant.components.recorder.const import DATA_INSTANCE
+        recorder = self.hass.data.get(DATA_INSTANCE)
+        if recorder is None or not await recorder.async_db_ready:
+            _LOGGER.error("The recorder is needed to import the homee history")
+            return 0
+        if not recorder.entity_filter(entity.entity_id):
+            _LOGGER.error("%s is not recorded, history not imported", entity.entity_id)
+            return 0
+
+        if self._marks is None:
+            self._marks = await self._store.async_load() or {}
+        node_id, attribute_id = entity.homee_attribute.node_id, entity.attribute_id
+        key = '{}_{}'.format(node_id, attribute_id)
+        total = get_attr_type(entity.homee_attribute) in TOTAL_TYPES
+        state = self.hass.states.get(entity.entity_id)
+        attributes = dict(state.attributes) if state is not None else {
+            'unit_of_measurement': entity.unit_of_measurement, 'friendly_name': entity.name}
+        # only complete hours are imported
+        end = int(time.time()) // HOUR * HOUR
+        start = self._marks.get(key, end - days * 86400)
+        # values of the hour the last page ended in
+        pending = []
+        written = 0
+        while start < end:
+            try:
+                values = await self._async_page(node_id, attribute_id, start, end)
+            except asyncio.TimeoutError:
+                _LOGGER.error("No history of attribute %s of node %s received", attribute_id, node_id)
+                break
+            if values is None:
+                _LOGGER.error("Not connected to homee, history import of %s stopped", entity.entity_id)
+                break
+            values = pending + values
+            if len(values) - len(pending) < HISTORY_PAGE_SIZE:
+                # last page
+                boundary = end
+            else:
+                boundary = int(values[-1][0] // HOUR * HOUR)
+            pending = [value for value in values if value[0] >= boundary]
+            states = hourly_states([value for value in values if value[0] < boundary], total)
+            written += await self.hass.async_add_executor_job(
+                write_states, self.hass, entity.entity_id, attributes, states)
+            if boundary > self._marks.get(key, 0):
+                self._marks[key] = boundary
+                await self._store.async_save(self._marks)
+            if boundary == end:
+                break
+            start = int(values[-1][0]) + 1
+        _LOGGER.info("Imported %d hours of history of %s", written, entity.entity_id)
+        return written
+
+    async def _async_page(self, node_id, attribute_id, start, end):
+        """Return up to HISTORY_PAGE_SIZE (timestamp, value) pairs, None if disconnected."""
+        key = (node_id, attribute_id)
+        future = asyncio.get_event_loop().create_future()
+        self._requests[key] = future
+        try:
+            if not await self.supervisor.async_send(
+                    'GET:nodes/{}/attributes/{}/history?from={}&till={}&limit={}'.format(
+                        node_id, attribute_id, start, end, HISTORY_PAGE_SIZE)):
+                return None
+            data = await asyncio.wait_for(future, HISTORY_TIMEOUT)
+        finally:
+            self._requests.pop(key, None)
+        return sorted((entry['timestamp'], float(entry['value'])) for entry in data.get('values', []))
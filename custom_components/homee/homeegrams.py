@@ -0,0 +1,41 @@
+"""Catalog of the homeegrams of the cube."""
+import logging
+import urllib.parse
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HomeegramCatalog:
+    """Homeegrams by id and by name, kept fresh from the websocket."""
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}
+
+    def update_all(self, homeegrams):
+        """Replace the catalog by the homeegrams of a node dump."""
+        self.by_id.clear()
+        self.by_name.clear()
+        for homeegram in homeegrams:
+            self.update(homeegram)
+
+    def update(self, data):
+        """Add or update a single homeegram."""
+        from pyhomee.models import Homeegram
+        homeegram = Homeegram(data)
+        homeegram.name = urllib.parse.unquote(homeegram.name)
+        previous = self.by_id.get(homeegram.id)
+        if previous is not None and self.by_name.get(previous.name) is previous:
+            del self.by_name[previous.name]
+        self.by_id[homeegram.id] = homeegram
+        self.by_name[homeegram.name] = homeegram
+        return homeegram
+
+    def resolve(self, id_or_name):
+        """Return the homeegram with the given id or name, None if unknown."""
+        if id_or_name in self.by_name:
+            return self.by_name[id_or_name]
+        try:
+            return self.by_id.get(int(id_or_name))
+        except (TypeError, ValueError):
+            return None
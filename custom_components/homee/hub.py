@@ -0,0 +1,517 @@
+"""Runtime data and node discovery of one homee cube."""
+import asyncio
+import logging
+import urllib.parse
+from collections import defaultdict
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+
+from .commands import HomeeCommandQueue
+from .const import (
+    CONF_BACKUPS, CONF_BUFFER, CONF_CUBE, CONF_DIAGNOSTICS, CONF_DIAGNOSTICS_ATTRIBUTES,
+    CONF_EVENTS, CONF_FILTER, CONF_GROUPS, CONF_HOMEEGRAMS, CONF_HOST, CONF_MAX_BYTES,
+    CONF_MAX_IN_FLIGHT, CONF_NAME, CONF_OPTIMISTIC, CONF_OPTIMISTIC_TIMEOUT, CONF_PASSWORD, CONF_PATH,
+    CONF_PORT, CONF_QUEUE_SIZE, CONF_RECORD, CONF_RELAY, CONF_SNAPSHOT, CONF_STATE_ATTRIBUTES,
+    CONF_THROTTLE, CONF_USERNAME, DEFAULT_ATTRIBUTE_POLICIES,
+    DISCOVERY_CHUNK_SIZE, DISCOVERY_DEBOUNCE, DISCOVERY_MAX_DELAY, EVENT_ATTRIBUTE_CHANGED,
+    EVENT_REPLAY, GROUP_COMPONENTS, HOMEE_IMPORT_GROUP, POLICY_ALL)
+from .diagnostics import HomeeMetrics
+from .dispatcher import HomeeDispatcher
+from .filters import DiscoveryFilter
+from .history import HistoryImporter
+from .homeegrams import HomeegramCatalog
+from .optimistic import ConfirmationTracker
+from .relay import HomeeRelay
+from .snapshot import HomeeSnapshot
+from .supervisor import HomeeSupervisor
+from .traffic import TrafficRecorder, async_replay, load_traffic
+from .util import get_attr_type, get_attr_type_id, is_deleting, is_sensor_attribute, map_homee_node
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HomeeHub:
+    """Connection, nodes and entities of one homee cube.
+
+    Discovered devices are buffered while nodes keep arriving (e.g. the
+    initial node dump) and handed to each platform at once. A platform is
+    only set up once the first device of it is discovered, so the Home
+    Assistant components of unused platforms are never imported.
+    """
+
+    def __init__(self, hass, entry, config):
+        from pyhomee import HomeeCube
+        self.hass = hass
+        self.entry = entry
+        self.entry_id = entry.entry_id
+        self.config = config
+        self.name = config.get(CONF_NAME)
+        self.cube = HomeeCube(config[CONF_CUBE], config[CONF_USERNAME], config[CONF_PASSWORD])
+
+        # instrumentation, None when diagnostics are disabled
+        self.metrics = HomeeMetrics() if config.get(CONF_DIAGNOSTICS, False) else None
+        self.diagnostics_attributes = self.metrics is not None and \
+            config.get(CONF_DIAGNOSTICS_ATTRIBUTES, False)
+        self.throttle = config.get(CONF_THROTTLE, {})
+        self.buffers = config.get(CONF_BUFFER, {})
+        self.filter = DiscoveryFilter(**config.get(CONF_FILTER, {}))
+        self.attribute_policies = dict(DEFAULT_ATTRIBUTE_POLICIES)
+        for policy, types in config.get(CONF_STATE_ATTRIBUTES, {}).items():
+            self.attribute_policies[policy] = None if types == POLICY_ALL else types
+
+        self.nodes = {}
+        # nodes restored from the snapshot and not yet seen on the websocket
+        self.restored_nodes = set()
+        # node id -> entities of the node added to Home Assistant
+        self.entities = defaultdict(list)
+        # group id -> pyhomee group
+        self.groups = {}
+        # node id -> names of the groups the node is in
+        self.node_groups = defaultdict(set)
+        # group id -> ids of the nodes in the group
+        self.group_nodes = defaultdict(list)
+        # ids of the groups exposed as entities, None if disabled
+        self.group_entities = set() if config.get(CONF_GROUPS, False) else None
+        self.homeegrams = HomeegramCatalog()
+        # ids of the homeegrams handed to the scene platform, None if disabled
+        self.scene_ids = set() if config.get(CONF_HOMEEGRAMS, False) else None
+        # homeegram id -> scene entity added to Home Assistant
+        self.scenes = {}
+
+        # attribute types fired as homee_attribute_changed events
+        self.event_types = set()
+        for name in config.get(CONF_EVENTS, []):
+            try:
+                self.event_types.add(get_attr_type_id(name))
+            except KeyError:
+                _LOGGER.error("Unknown attribute type %s in %s", name, CONF_EVENTS)
+        self.dispatcher = HomeeDispatcher(self.cube, self.metrics, self.event_types,
+                                          self._fire_attribute_event)
+        self.commands = HomeeCommandQueue(self.cube, config.get(CONF_MAX_IN_FLIGHT, 8), self.metrics)
+        if self.metrics is not None:
+            self.dispatcher.acknowledge = self.commands.acknowledge
+        self.confirmations = None
+        if config.get(CONF_OPTIMISTIC, False):
+            self.confirmations = ConfirmationTracker(config.get(CONF_OPTIMISTIC_TIMEOUT, 10))
+        self.supervisor = HomeeSupervisor(self.cube, self._async_connection_changed,
+                                          self._async_dump_received, self.metrics,
+                                          self._async_homeegram_received, self._history_received)
+        self.history = HistoryImporter(hass, self.entry_id, self.supervisor)
+        self.recorder = None
+        record = config.get(CONF_RECORD)
+        if record is not None:
+            self.recorder = TrafficRecorder(hass.config.path(record[CONF_PATH]),
+                                            record[CONF_MAX_BYTES], record[CONF_BACKUPS])
+            self.supervisor.listeners.append(self.recorder.record)
+        self.relay = None
+        relay = config.get(CONF_RELAY)
+        if relay is not None:
+            self.relay = HomeeRelay(self.supervisor, config[CONF_USERNAME], config[CONF_PASSWORD],
+                                    relay[CONF_HOST], relay[CONF_PORT], relay[CONF_QUEUE_SIZE])
+            self.supervisor.listeners.append(self.relay.broadcast)
+        self.snapshot = None
+        if config.get(CONF_SNAPSHOT, True):
+            self.snapshot = HomeeSnapshot(hass, self.entry_id, self.nodes, self.dispatcher.stores,
+                                          self.node_groups)
+
+        # platforms forwarded to the config entry
+        self.platforms = set()
+        # platform -> callback adding the devices of the platform
+        self._platforms = {}
+        # platform -> devices waiting for the platform to be set up
+        self._unclaimed = defaultdict(list)
+        self._pending = defaultdict(list)
+        self._flush_handle = None
+        self._flush_started = None
+        self._task = None
+        self._remove_stop_listener = None
+
+    async def async_start(self):
+        """Restore the snapshot and connect to the cube."""
+        self.cube.register_all(self.async_handle_node)
+        if self.snapshot is not None:
+            # create the entities of the last known nodes before the cube answers
+            for node in await self.snapshot.async_load():
+                await self.async_handle_node(node)
+                self.restored_nodes.add(node.id)
+            _LOGGER.info("Restored %d nodes from snapshot", len(self.restored_nodes))
+        self._remove_stop_listener = self.hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_shutdown)
+        self._task = self.hass.loop.create_task(self.supervisor.async_run())
+        if self.relay is not None:
+            await self.relay.async_start()
+
+    async def async_stop(self):
+        """Disconnect from the cube and save the snapshot."""
+        if self._remove_stop_listener is not None:
+            self._remove_stop_listener()
+            self._remove_stop_listener = None
+        await self._async_shutdown(None)
+
+    async def _async_shutdown(self, event):
+        _LOGGER.info("Shutting down homee websocket of %s", self.cube.hostname)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self.snapshot is not None:
+            await self.snapshot.async_save()
+        if self.relay is not None:
+            await self.relay.async_stop()
+        if self.recorder is not None:
+            await self.recorder.async_close()
+        await self.cube.session.close()
+
+    def register_platform(self, component, add_devices):
+        """Register the callback of a platform adding discovered devices."""
+        self._platforms[component] = add_devices
+        devices = self._unclaimed.pop(component, None)
+        if devices:
+            self._add_in_chunks(add_devices, devices)
+
+    def add_devices(self, component, devices):
+        """Hand discovered devices to their platform."""
+        add_devices = self._platforms.get(component)
+        if add_devices is None:
+            self._unclaimed[component].extend(devices)
+            self._load_platform(component)
+        else:
+            self._add_in_chunks(add_devices, devices)
+
+    def _add_in_chunks(self, add_devices, devices):
+        """Create the entities of many devices without blocking the event loop."""
+        if len(devices) <= DISCOVERY_CHUNK_SIZE:
+            add_devices(devices)
+        else:
+            self.hass.async_create_task(self._async_add_in_chunks(add_devices, devices))
+
+    async def _async_add_in_chunks(self, add_devices, devices):
+        for offset in range(0, len(devices), DISCOVERY_CHUNK_SIZE):
+            add_devices(devices[offset:offset + DISCOVERY_CHUNK_SIZE])
+            await asyncio.sleep(0)
+
+    def _load_platform(self, component):
+        if component in self.platforms:
+            return
+        self.platforms.add(component)
+        self.hass.async_create_task(
+            self.hass.config_entries.async_forward_entry_setup(self.entry, component))
+
+    def _flush_discovery(self):
+        self._flush_handle = None
+        self._flush_started = None
+        if self.group_entities is not None:
+            self._discover_groups()
+        for component in list(self._pending):
+            self.add_devices(component, self._pending.pop(component))
+        if self.snapshot is not None:
+            self.snapshot.async_schedule_save()
+
+    def _schedule_flush(self):
+        now = self.hass.loop.time()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        else:
+            self._flush_started = now
+        delay = min(DISCOVERY_DEBOUNCE, self._flush_started + DISCOVERY_MAX_DELAY - now)
+        self._flush_handle = self.hass.loop.call_later(max(delay, 0), self._flush_discovery)
+
+    def _discover_groups(self):
+        """Add the groups whose nodes all belong to the same platform."""
+        for group_id, group in self.groups.items():
+            if group_id in self.group_entities or not self.group_allowed(group):
+                continue
+            component = self.map_homee_group(group_id)
+            if component is not None:
+                self.group_entities.add(group_id)
+                self._pending[component].append({'group': group, 'node_ids': self.group_nodes[group_id]})
+
+    async def async_handle_node(self, node):
+        """Discover a node received from the cube."""
+        if is_deleting(node):
+            # the cube announces the removal only with this node update
+            if node.id in self.nodes:
+                await self.async_remove_node(node.id)
+            return
+        if node.id in self.nodes:
+            # attribute values of known nodes are diffed and dispatched by
+            # HomeeDispatcher, here only entities are added and removed
+            await self._async_reconcile_node(node)
+            return
+        _LOGGER.info("Discovered new node %s: %s" % (node.id, node.name))
+        self.nodes[node.id] = node
+        self.dispatcher.track_node(node)
+        if not self.filter.node_allowed(node, self.node_groups[node.id]):
+            _LOGGER.debug("Node %s is filtered, not creating entities", node.id)
+            return
+        node_type = map_homee_node(node)
+        if node_type:
+            self._pending[node_type].append({'node': node})
+        for attribute in node.attributes:
+            if self.is_sensor_attribute(node, attribute):
+                self._pending['sensor'].append({'node': node, 'attribute': attribute})
+        self._schedule_flush()
+
+    async def _async_reconcile_node(self, node):
+        """Replace a known node, adding and removing entities for its changes.
+
+        Sensors are added for new attributes and removed with their
+        attribute. If the profile or the attribute types of the node
+        changed, the entities of the whole node are rebuilt.
+        """
+        previous = self.nodes[node.id]
+        self.nodes[node.id] = node
+        restored = node.id in self.restored_nodes
+        self.restored_nodes.discard(node.id)
+        if previous.profile == node.profile and \
+                [attr.id for attr in previous.attributes] == [attr.id for attr in node.attributes]:
+            if restored and self.group_entities is not None:
+                self._schedule_flush()
+            return
+        if not self.filter.node_allowed(node, self.node_groups[node.id]):
+            return
+        known_ids = set(attr.id for attr in previous.attributes)
+        removed_ids = known_ids.difference(attr.id for attr in node.attributes)
+        rebuild = previous.profile != node.profile or \
+            set(attr.type for attr in previous.attributes) != set(attr.type for attr in node.attributes)
+        if rebuild or removed_ids:
+            _LOGGER.info("Node %s changed, updating its entities", node.id)
+        for entity in list(self.entities.get(node.id, ())):
+            attribute_ids = entity.subscribed_attribute_ids()
+            if attribute_ids is None and rebuild or \
+                    attribute_ids is not None and removed_ids.intersection(attribute_ids):
+                await entity.async_remove()
+        if rebuild:
+            node_type = map_homee_node(node)
+            if node_type:
+                self._pending[node_type].append({'node': node})
+        for attribute in node.attributes:
+            if attribute.id not in known_ids and self.is_sensor_attribute(node, attribute):
+                self._pending['sensor'].append({'node': node, 'attribute': attribute})
+        if self._pending or self.group_entities is not None:
+            self._schedule_flush()
+
+    async def async_remove_node(self, node_id):
+        """Remove a node which no longer exists on the cube with its entities."""
+        _LOGGER.info("Removing node %s", node_id)
+        self.nodes.pop(node_id, None)
+        self.restored_nodes.discard(node_id)
+        for entity in list(self.entities.get(node_id, ())):
+            await entity.async_remove()
+        self.entities.pop(node_id, None)
+        self.dispatcher.untrack_node(node_id)
+        # pyhomee keeps the node and its callbacks, a node coming back with
+        # the same id would otherwise be dispatched twice
+        self.cube.registry._nodes.pop(node_id, None)
+        self.cube.registry._node_callbacks.pop(node_id, None)
+        if self.snapshot is not None:
+            self.snapshot.async_schedule_save()
+
+    def _fire_attribute_event(self, node_id, attribute, previous):
+        node = self.nodes.get(node_id)
+        self.hass.bus.async_fire(EVENT_ATTRIBUTE_CHANGED, {
+            'entry_id': self.entry_id,
+            'cube': self.cube.hostname,
+            'node_id': node_id,
+            'node_name': node.name if node is not None else None,
+            'attribute_id': attribute.id,
+            'type': get_attr_type(attribute),
+            'value': attribute.value,
+            'previous': previous,
+        })
+
+    async def _async_connection_changed(self, connected):
+        if not connected and self.relay is not None:
+            # the consumers resync once the cube is back
+            await self.relay.async_disconnect_all()
+        # entities are unavailable while disconnected
+        await self.dispatcher.async_refresh_all()
+
+    async def _async_dump_received(self, data):
+        self.update_groups(data.get('groups', []), data.get('relationships', []))
+        self.homeegrams.update_all(data.get('homeegrams', []))
+        await self._async_sync_scenes()
+        node_ids = set(node['id'] for node in data.get('nodes', []))
+        for node_id in set(self.nodes) - node_ids:
+            await self.async_remove_node(node_id)
+
+    async def _async_homeegram_received(self, data):
+        self.homeegrams.update(data)
+        await self._async_sync_scenes()
+
+    def _history_received(self, data):
+        self.history.handle(data)
+
+    async def _async_sync_scenes(self):
+        """Add, update and remove the scenes to follow the homeegram catalog.
+
+        Scenes of deleted or hidden homeegrams are removed, renamed
+        homeegrams are taken over by their scene.
+        """
+        if self.scene_ids is None:
+            return
+        for homeegram_id, scene in list(self.scenes.items()):
+            homeegram = self.homeegrams.by_id.get(homeegram_id)
+            if homeegram is None or not homeegram.visible:
+                await scene.async_remove()
+            else:
+                scene.update_homeegram(homeegram)
+        devices = [{'homeegram': homeegram} for homeegram in self.homeegrams.by_id.values()
+                   if homeegram.visible and homeegram.id not in self.scene_ids]
+        if devices:
+            self.scene_ids.update(device['homeegram'].id for device in devices)
+            self.add_devices('scene', devices)
+
+    def update_groups(self, groups, relationships):
+        """Take over the groups and the group membership of the nodes."""
+        from pyhomee.models import Group
+        self.groups.clear()
+        for group in groups:
+            self.groups[group['id']] = Group(group)
+        self.node_groups.clear()
+        self.group_nodes.clear()
+        for relationship in relationships:
+            group = self.groups.get(relationship.get('group_id'))
+            if group is not None and relationship.get('node_id'):
+                self.node_groups[relationship['node_id']].add(urllib.parse.unquote(group.name))
+                self.group_nodes[group.id].append(relationship['node_id'])
+
+    def group_allowed(self, group):
+        """Return whether a group may become an entity.
+
+        The import group only marks the nodes to add and is never exposed,
+        other groups need to pass the group filters and to contain at least
+        one node passing the node filters.
+        """
+        name = urllib.parse.unquote(group.name)
+        if name == HOMEE_IMPORT_GROUP or not self.filter.group_allowed(name):
+            return False
+        for node_id in self.group_nodes.get(group.id, ()):
+            node = self.nodes.get(node_id)
+            if node is not None and self.filter.node_allowed(node, self.node_groups[node_id]):
+                return True
+        return False
+
+    def map_homee_group(self, group_id):
+        """Return the platform of a group if all of its nodes share a group platform."""
+        components = set()
+        for node_id in self.group_nodes.get(group_id, ()):
+            node = self.nodes.get(node_id)
+            if node is None:
+                return None
+            components.add(map_homee_node(node))
+        if len(components) != 1:
+            return None
+        component = components.pop()
+        return component if component in GROUP_COMPONENTS else None
+
+    def buffered_entities(self):
+        """Return the entities recording a series of raw values."""
+        return [entity for entities in self.entities.values() for entity in entities
+                if getattr(entity, 'buffer', None) is not None]
+
+    def sensor_entities(self):
+        """Return the entities of single attributes."""
+        return [entity for entities in self.entities.values() for entity in entities
+                if getattr(entity, 'attribute_id', None) is not None]
+
+    def is_sensor_attribute(self, node, attribute):
+        """Return whether an attribute is exposed as a separate sensor."""
+        return is_sensor_attribute(node, attribute) and \
+            self.filter.attribute_allowed(get_attr_type(attribute))
+
+    async def async_play_homeegrams(self, ids_or_names):
+        """Play homeegrams given by id or name concurrently.
+
+        Ids missing from the catalog, e.g. before the first node dump, are
+        sent to the cube as they are; only unknown names are rejected.
+        """
+        homeegram_ids = []
+        for id_or_name in ids_or_names:
+            homeegram = self.homeegrams.resolve(id_or_name)
+            if homeegram is not None:
+                homeegram_ids.append(homeegram.id)
+                continue
+            try:
+                homeegram_ids.append(int(id_or_name))
+            except (TypeError, ValueError):
+                _LOGGER.error("Unknown homeegram %s", id_or_name)
+        await asyncio.gather(*[self.cube.play_homeegram(homeegram_id) for homeegram_id in homeegram_ids])
+
+    async def async_send_batch(self, commands):
+        """Send node commands given as dicts with node_id, attribute_id and value."""
+        batch = []
+        for command in commands:
+            node = self.nodes.get(command.get("node_id"))
+            attribute = None
+            if node is not None:
+                attribute = self.dispatcher.get_store(node).get(command.get("attribute_id"))
+            if attribute is None:
+                _LOGGER.error("Unknown attribute %s of node %s",
+                              command.get("attribute_id"), command.get("node_id"))
+                continue
+            batch.append((node, attribute, command.get("value")))
+        await self.commands.async_send_batch(batch)
+
+    async def async_set_mode(self, mode):
+        """Set the homee mode (home, away, sleeping, vacation) of the cube."""
+        from pyhomee.const import HomeeMode
+        node = self.nodes.get(-1)
+        attribute = self.dispatcher.get_store(node).by_name.get('HomeeMode') if node else None
+        if mode not in HomeeMode or attribute is None:
+            _LOGGER.error("Unkown mode %s", mode)
+            return
+        _LOGGER.info("setting mode to %s (%i)", mode, HomeeMode[mode])
+        await self.commands.async_send(node, attribute, HomeeMode[mode])
+
+    async def async_import_history(self, entity_ids=None, days=10):
+        """Import the cube history of sensors into the recorder.
+
+        Sensors are imported one after another to limit the load on the
+        cube, each from its high-water mark on.
+        """
+        for entity in self.sensor_entities():
+            if entity_ids is None or entity.entity_id in entity_ids:
+                await self.history.async_import(entity, days)
+
+    async def async_replay(self, paths, speed=1.0):
+        """Replay recorded traffic through the message handling of the cube.
+
+        Fires a homee_replay event with the number of messages, the duration
+        and, with diagnostics enabled, the state writes issued.
+        """
+        paths = [self.hass.config.path(path) for path in paths]
+        messages = await self.hass.async_add_executor_job(load_traffic, paths)
+        writes = self.metrics.counters['state_writes'] if self.metrics is not None else None
+        _LOGGER.info("Replaying %d messages at speed %s", len(messages), speed or 'max')
+        seconds = await async_replay(messages, self.supervisor.async_replay_message, speed)
+        data = {
+            'entry_id': self.entry_id,
+            'cube': self.cube.hostname,
+            'messages': len(messages),
+            'seconds': round(seconds, 3),
+            'messages_per_second': round(len(messages) / seconds, 1) if seconds else None,
+            'state_writes': None,
+        }
+        if writes is not None:
+            data['state_writes'] = self.metrics.counters['state_writes'] - writes
+        _LOGGER.info("Replay finished: %s", data)
+        self.hass.bus.async_fire(EVENT_REPLAY, data)
+        return data
+
+    def diagnostics(self):
+        """Return the connection, command and hot path statistics."""
+        return {
+            'connection': self.supervisor.diagnostics(),
+            'nodes': len(self.nodes),
+            'commands': {
+                'pending': self.commands.pending,
+                'in_flight': self.commands.in_flight,
+            },
+            'confirmations': self.confirmations.latencies() if self.confirmations is not None else None,
+            'metrics': self.metrics.as_dict() if self.metrics is not None else None,
+            'recorded_messages': self.recorder.messages if self.recorder is not None else None,
+            'relay': self.relay.diagnostics() if self.relay is not None else None,
+        }
@@ -9,28 +9,37 @@ import logging
 from homeassistant.components.light import (
     ATTR_BRIGHTNESS, ENTITY_ID_FORMAT,
     SUPPORT_BRIGHTNESS, SUPPORT_COLOR, Light)
-from custom_components.homee import (
-    HOMEE_NODES, HOMEE_ATTRIBUTES, HOMEE_CUBE, HomeeDevice)
+from custom_components.homee import DOMAIN, HomeeDevice, HomeeGroupDevice
 
 DEPENDENCIES = ['homee']
 
 _LOGGER = logging.getLogger(__name__)
 
 
-async def async_setup_platform(hass, config, async_add_devices, discovery_info=None):
-    """Perform the setup for Vera controller devices."""
-    devices = []
-    for attribute in HOMEE_ATTRIBUTES['light']:
-        devices.append(HomeeLight(hass, HOMEE_NODES[attribute.node_id], HOMEE_CUBE))
-    async_add_devices(devices)
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Add the lights discovered by the hub of a cube."""
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
+    def add_devices(discovered):
+        devices = []
+        for data in discovered:
+            if 'group' in data:
+                devices.append(HomeeGroupLight(hass, data['group'], data['node_ids'], hub))
+            else:
+                devices.append(HomeeLight(hass, data['node'], hub))
+        async_add_entities(devices)
+    hub.register_platform('light', add_devices)
 
 
 class HomeeLight(HomeeDevice, Light):
     """Representation of a Homee Light."""
 
-    def __init__(self, hass, homee_node, cube):
+    policy = 'light'
+    state_types = ('OnOff', 'DimmingLevel', 'Color')
+
+    def __init__(self, hass, homee_node, hub):
         """Initialize the switch."""
-        HomeeDevice.__init__(self, hass, homee_node, cube)
+        HomeeDevice.__init__(self, hass, homee_node, hub)
         self.entity_id = ENTITY_ID_FORMAT.format(self.homee_id)
 
     def update_state(self, attribute):
@@ -39,14 +48,14 @@ class HomeeLight(HomeeDevice, Light):
     async def async_turn_on(self, **kwargs):
         """Turn device on."""
         if ATTR_BRIGHTNESS in kwargs and self.has_attr('DimmingLevel'):
-            await self.cube.send_node_command(self._homee_node, self.get_attr('DimmingLevel'),
-                                        (kwargs[ATTR_BRIGHTNESS] / 255) * 100)
+            await self.send_command(self.get_attr('DimmingLevel'),
+                                    (kwargs[ATTR_BRIGHTNESS] / 255) * 100)
         else:
-            await self.cube.send_node_command(self._homee_node, self.get_attr('OnOff'), 1)
+            await self.send_command(self.get_attr('OnOff'), 1)
 
     async def async_turn_off(self, **kwargs):
         """Turn device off."""
-        await self.cube.send_node_command(self._homee_node, self.get_attr('OnOff'), 0)
+        await self.send_command(self.get_attr('OnOff'), 0)
 
     @property
     def is_on(self):
@@ -69,3 +78,43 @@ class HomeeLight(HomeeDevice, Light):
         if self.has_attr('Color'):
             return SUPPORT_BRIGHTNESS | SUPPORT_COLOR
         return SUPPORT_BRIGHTNESS
+
+
+class HomeeGroupLight(HomeeGroupDevice, Light):
+    """Representation of a homee group of lights."""
+
+    state_types = ('OnOff', 'DimmingLevel')
+
+    def __init__(self, hass, group, node_ids, hub):
+        """Initialize the light group."""
+        HomeeGroupDevice.__init__(self, hass, group, node_ids, hub)
+        self.entity_id = ENTITY_ID_FORMAT.format(self.homee_id)
+
+    async def async_turn_on(self, **kwargs):
+        """Turn the lights on."""
+        if ATTR_BRIGHTNESS in kwargs and self.get_attr_values('DimmingLevel'):
+            await self.send_group_command('DimmingLevel', (kwargs[ATTR_BRIGHTNESS] / 255) * 100)
+        else:
+            await self.send_group_command('OnOff', 1)
+
+    async def async_turn_off(self, **kwargs):
+        """Turn the lights off."""
+        await self.send_group_command('OnOff', 0)
+
+    @property
+    def is_on(self):
+        """Return true if any light is on."""
+        return any(self.get_attr_values('OnOff'))
+
+    @property
+    def brightness(self):
+        """Return the mean brightness of the lights."""
+        levels = self.get_attr_values('DimmingLevel')
+        if not levels:
+            return None
+        return (sum(levels) / len(levels) / 100) * 255
+
+    @property
+    def supported_features(self):
+        """Flag supported features."""
+        return SUPPORT_BRIGHTNESS if self.get_attr_values('DimmingLevel') else 0
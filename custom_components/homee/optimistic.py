@@ -0,0 +1,92 @@
+"""Tracking of optimistically applied homee commands."""
+import asyncio
+import logging
+import numbers
+from collections import defaultdict
+
+_LOGGER = logging.getLogger(__name__)
+
+# numeric values closer than this to the target confirm a command
+CONFIRM_TOLERANCE = 0.5
+
+
+def value_matches(value, target):
+    """Return whether a reported value confirms the target value."""
+    if isinstance(value, numbers.Number) and isinstance(target, numbers.Number):
+        return abs(value - target) < CONFIRM_TOLERANCE
+    return value == target
+
+
+class NodeLatency:
+    """Round trip statistics of the confirmed commands of a node."""
+
+    def __init__(self):
+        self.confirmed = 0
+        self.timeouts = 0
+        self.last = None
+        self.max = 0
+        self.total = 0
+
+    def as_dict(self):
+        return {
+            'confirmed': self.confirmed,
+            'timeouts': self.timeouts,
+            'last_ms': None if self.last is None else round(self.last * 1000, 1),
+            'mean_ms': round(self.total / self.confirmed * 1000, 1) if self.confirmed else None,
+            'max_ms': round(self.max * 1000, 1),
+        }
+
+
+class ConfirmationTracker:
+    """Track commands until the cube reports the target value.
+
+    Commands which are not confirmed within the timeout are expired and the
+    rollback callback given with the command is called.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        # (node_id, attribute_id) -> (target, sent, timer)
+        self._pending = {}
+        self._latency = defaultdict(NodeLatency)
+
+    def track(self, node_id, attribute_id, target, rollback):
+        """Start tracking a command, replacing a pending one."""
+        key = (node_id, attribute_id)
+        self.cancel(*key)
+        loop = asyncio.get_event_loop()
+        timer = loop.call_later(self.timeout, self._expire, key, rollback)
+        self._pending[key] = (target, loop.time(), timer)
+
+    def confirm(self, node_id, attribute):
+        """Return True and stop tracking if the attribute confirms the command."""
+        key = (node_id, attribute.id)
+        pending = self._pending.get(key)
+        if pending is None or not value_matches(attribute.value, pending[0]):
+            return False
+        del self._pending[key]
+        pending[2].cancel()
+        latency = asyncio.get_event_loop().time() - pending[1]
+        stats = self._latency[node_id]
+        stats.confirmed += 1
+        stats.last = latency
+        stats.total += latency
+        stats.max = max(stats.max, latency)
+        return True
+
+    def cancel(self, node_id, attribute_id):
+        """Stop tracking a command without rolling back."""
+        pending = self._pending.pop((node_id, attribute_id), None)
+        if pending is not None:
+            pending[2].cancel()
+
+    def latencies(self):
+        """Return the round trip statistics per node id."""
+        return {node_id: stats.as_dict() for node_id, stats in self._latency.items()}
+
+    def _expire(self, key, rollback):
+        target = self._pending.pop(key)[0]
+        self._latency[key[0]].timeouts += 1
+        _LOGGER.warning("Command %s for attribute %s of node %s was not confirmed "
+                        "within %s seconds, rolling back", target, key[1], key[0], self.timeout)
+        rollback()
@@ -0,0 +1,154 @@
+"""Relay sharing the websocket connection to a homee cube with other consumers."""
+import asyncio
+import functools
+import hashlib
+import hmac
+import logging
+import secrets
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HomeeRelay:
+    """Serve the cube API to further consumers over the one cube connection.
+
+    Consumers, e.g. another Home Assistant or Node-RED, connect to the relay
+    as if it were the cube, with the credentials of the cube. Every message
+    received from the cube is queued for every consumer, the messages of
+    the consumers (commands) are forwarded to the cube, so the answers
+    reach every consumer. The node dump answering the GET:all of a
+    consumer is only queued for that consumer and not handled again here.
+
+    Each consumer has a bounded queue drained by its own sender, which waits
+    until the socket accepted the message. A slow consumer therefore never
+    delays the cube connection or the other consumers: once its queue is
+    full it is disconnected and resyncs with GET:all after reconnecting.
+    While the cube is disconnected, consumers are refused.
+    """
+
+    def __init__(self, supervisor, username, password, host, port, queue_size):
+        self.supervisor = supervisor
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self._username = username
+        self._password = hashlib.sha512(password.encode('utf-8')).hexdigest()
+        self._token = secrets.token_hex(32)
+        # websocket -> (queue, sender task, address of the consumer)
+        self._consumers = {}
+        self._runner = None
+        self.forwarded = 0
+        self.disconnected_slow = 0
+
+    async def async_start(self):
+        """Listen for consumers."""
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_post('/access_token', self._access_token)
+        app.router.add_get('/connection', self._connection)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as err:
+            _LOGGER.error("Unable to start the homee relay on %s:%s: %s", self.host, self.port, err)
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        _LOGGER.info("homee relay listening on %s:%s", self.host, self.port)
+
+    async def async_stop(self):
+        """Disconnect the consumers and stop listening."""
+        await self.async_disconnect_all()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def async_disconnect_all(self):
+        """Disconnect all consumers, e.g. when the cube connection was lost."""
+        for ws in list(self._consumers):
+            await self._async_close(ws)
+
+    def broadcast(self, message):
+        """Queue a message received from the cube for every consumer."""
+        for ws in list(self._consumers):
+            self._queue(ws, message)
+
+    def _queue(self, ws, message):
+        consumer = self._consumers.get(ws)
+        if consumer is None:
+            return
+        try:
+            consumer[0].put_nowait(message)
+        except asyncio.QueueFull:
+            _LOGGER.warning("homee relay consumer %s is too slow, disconnecting", consumer[2])
+            self.disconnected_slow += 1
+            self._drop(ws)
+            asyncio.ensure_future(ws.close())
+
+    def diagnostics(self):
+        """Return the consumers and their queue lengths."""
+        return {
+            'consumers': len(self._consumers),
+            'queued': [queue.qsize() for queue, _, _ in self._consumers.values()],
+            'forwarded': self.forwarded,
+            'disconnected_slow': self.disconnected_slow,
+        }
+
+    async def _access_token(self, request):
+        from aiohttp import BasicAuth, web
+        try:
+            auth = BasicAuth.decode(request.headers.get('Authorization', ''))
+        except ValueError:
+            raise web.HTTPUnauthorized()
+        if not hmac.compare_digest(auth.login.encode(), self._username.encode()) or \
+                not hmac.compare_digest(auth.password.encode(), self._password.encode()):
+            raise web.HTTPUnauthorized()
+        return web.Response(
+            text='access_token={}&user_id=1&device_id=1&expires=31536000'.format(self._token))
+
+    async def _connection(self, request):
+        from aiohttp import WSMsgType, web
+        if not hmac.compare_digest(request.query.get('access_token', ''), self._token):
+            raise web.HTTPUnauthorized()
+        if not self.supervisor.connected:
+            raise web.HTTPServiceUnavailable()
+        ws = web.WebSocketResponse(protocols=('v2',))
+        await ws.prepare(request)
+        queue = asyncio.Queue(self.queue_size)
+        self._consumers[ws] = (queue, asyncio.ensure_future(self._async_send(ws, queue)),
+                               request.remote)
+        _LOGGER.info("homee relay consumer %s connected, %d consumers",
+                     request.remote, len(self._consumers))
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                # forwarding one message at a time keeps the consumer's order
+                if msg.data == 'GET:all':
+                    sent = await self.supervisor.async_request_dump(
+                        functools.partial(self._queue, ws))
+                else:
+                    sent = await self.supervisor.async_send(msg.data)
+                if sent:
+                    self.forwarded += 1
+        finally:
+            await self._async_close(ws)
+        return ws
+
+    async def _async_send(self, ws, queue):
+        while True:
+            message = await queue.get()
+            await ws.send_str(message)
+
+    def _drop(self, ws):
+        """Stop queueing for a consumer, return False if already dropped."""
+        consumer = self._consumers.pop(ws, None)
+        if consumer is None:
+            return False
+        consumer[1].cancel()
+        return True
+
+    async def _async_close(self, ws):
+        if self._drop(ws):
+            await ws.close()
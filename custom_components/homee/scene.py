@@ -0,0 +1,69 @@
+"""
+Support for homeegrams as Homee scenes.
+
+For more details about this platform, please refer to the documentation at
+https://home-assistant.io/components/scene.homee/
+"""
+import logging
+
+from homeassistant.components.scene import Scene
+from homeassistant.util import slugify
+from custom_components.homee import DOMAIN
+
+DEPENDENCIES = ['homee']
+
+_LOGGER = logging.getLogger(__name__)
+
+ENTITY_ID_FORMAT = 'scene.homeegram_{}_{}'
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Add the homeegrams of the hub of a cube."""
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
+    def add_devices(discovered):
+        async_add_entities([HomeeHomeegramScene(data['homeegram'], hub) for data in discovered])
+    hub.register_platform('scene', add_devices)
+
+
+class HomeeHomeegramScene(Scene):
+    """Representation of a homeegram."""
+
+    def __init__(self, homeegram, hub):
+        """Initialize the scene."""
+        self._homeegram = homeegram
+        self._hub = hub
+        name = slugify(homeegram.name)
+        if hub.name:
+            name = "{}_{}".format(slugify(hub.name), name)
+        self.entity_id = ENTITY_ID_FORMAT.format(name, homeegram.id)
+
+    async def async_added_to_hass(self):
+        """Follow the updates of the homeegram."""
+        self._hub.scenes[self._homeegram.id] = self
+
+    async def async_will_remove_from_hass(self):
+        """Stop following the homeegram."""
+        self._hub.scenes.pop(self._homeegram.id, None)
+        self._hub.scene_ids.discard(self._homeegram.id)
+
+    def update_homeegram(self, homeegram):
+        """Take over an updated homeegram, writing the state if it was renamed."""
+        renamed = homeegram.name != self._homeegram.name
+        self._homeegram = homeegram
+        if renamed:
+            self.async_schedule_update_ha_state()
+
+    @property
+    def name(self):
+        """Return the name of the homeegram."""
+        return self._homeegram.name
+
+    @property
+    def device_state_attributes(self):
+        """Return the id of the homeegram."""
+        return {'homeegram_id': self._homeegram.id}
+
+    async def async_activate(self, **kwargs):
+        """Play the homeegram."""
+        await self._hub.async_play_homeegrams([self._homeegram.id])
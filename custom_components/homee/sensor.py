@@ -7,8 +7,9 @@ https://home-assistant.io/components/sensor.homee/
 import logging
 import re
 
-from custom_components.homee import (
-    HomeeDevice, HOMEE_CUBE, get_attr_type, DOMAIN)
+from custom_components.homee import HomeeDevice, get_attr_type, DOMAIN
+from custom_components.homee.const import CONF_AGGREGATE, CONF_INTERVAL, CONF_SIZE
+from custom_components.homee.timeseries import SeriesBuffer
 from homeassistant.components.sensor import ENTITY_ID_FORMAT
 from homeassistant.helpers.entity import Entity
 from homeassistant.util import slugify
@@ -17,37 +18,74 @@ DEPENDENCIES = ['homee']
 
 _LOGGER = logging.getLogger(__name__)
 
+_CAMEL_CASE = re.compile("([a-z])([A-Z])")
+# attribute type name -> words of the name, e.g. "Current Energy Use"
+_LABELS = {}
 
-async def async_setup_platform(hass, config, async_add_devices, discovery_info=None):
-    """Perform the setup for Homee controller devices."""
-    devices = []
-    for data in discovery_info['devices']:
-        if data.get('node').id == -1:
-            devices.append(HomeeCubeEntity(hass, data.get('node'), HOMEE_CUBE))
-        else:
-            devices.append(HomeeSensor(hass, data.get('node'), data.get('attribute'), HOMEE_CUBE))
-    async_add_devices(devices)
+
+def attribute_label(attr_type):
+    """Split an attribute type name into words, cached per type."""
+    label = _LABELS.get(attr_type)
+    if label is None:
+        label = _LABELS[attr_type] = _CAMEL_CASE.sub(r"\g<1> \g<2>", attr_type)
+    return label
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Add the sensors discovered by the hub of a cube."""
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
+    def add_devices(discovered):
+        devices = []
+        for data in discovered:
+            if data.get('node').id == -1:
+                devices.append(HomeeCubeEntity(hass, data.get('node'), hub))
+            else:
+                devices.append(HomeeSensor(hass, data.get('node'), data.get('attribute'), hub))
+        async_add_entities(devices)
+    hub.register_platform('sensor', add_devices)
 
 
 class HomeeSensor(HomeeDevice, Entity):
     """Representation of a Homee Sensor."""
 
-    def __init__(self, hass, homee_node, homee_attribute, cube):
+    def __init__(self, hass, homee_node, homee_attribute, hub):
         """Initialize the sensor."""
 
         self.homee_attribute = homee_attribute
         self.current_value = homee_attribute.value
         self.attribute_id = homee_attribute.id
 
-        HomeeDevice.__init__(self, hass, homee_node, cube)
-        self._name = "{} {}".format(self._homee_node.name,
-                                    re.sub("([a-z])([A-Z])", "\g<1> \g<2>", get_attr_type(homee_attribute)))
+        HomeeDevice.__init__(self, hass, homee_node, hub)
+        self._unique_id = "{}_{}".format(self._unique_id, self.attribute_id)
+        # keep the shared record instead of the pyhomee attribute
+        self.homee_attribute = self._store.get(self.attribute_id) or homee_attribute
+        self._name = "{} {}".format(self._homee_node.name, attribute_label(get_attr_type(homee_attribute)))
         self.entity_id = ENTITY_ID_FORMAT.format(
             "{}_{}_{}".format(self.homee_id, slugify(get_attr_type(homee_attribute)), homee_attribute.id))
+        self.buffer = None
+        options = hub.buffers.get(get_attr_type(homee_attribute))
+        if options is not None:
+            self.buffer = SeriesBuffer(self._write_state, options.get(CONF_SIZE, 3600),
+                                       options.get(CONF_INTERVAL, 60), options.get(CONF_AGGREGATE, 'mean'))
+            # cancelled together with the coalescers
+            self._coalescers[get_attr_type(homee_attribute)] = self.buffer
+
+    def subscribed_attribute_ids(self):
+        """Only the sensor's own attribute is relevant."""
+        return [self.attribute_id]
+
+    def _get_coalescer(self, attr_type):
+        """Let the buffer publish the state of a buffered sensor."""
+        if self.buffer is not None:
+            return self.buffer
+        return HomeeDevice._get_coalescer(self, attr_type)
 
     @property
     def state(self):
         """Return the name of the sensor."""
+        if self.buffer is not None and self.buffer.stats is not None:
+            return self.buffer.value
         return self.current_value
 
     @property
@@ -61,7 +99,8 @@ class HomeeSensor(HomeeDevice, Entity):
     def device_state_attributes(self):
         """Return the state attributes of the device."""
         attr = {}
-
+        if self.buffer is not None and self.buffer.stats is not None:
+            attr.update(self.buffer.stats)
         return attr
 
     def update_state(self, attribute):
@@ -71,21 +110,35 @@ class HomeeSensor(HomeeDevice, Entity):
 
 
 class HomeeCubeEntity(HomeeDevice):
-    def __init__(self, hass, homee_node, cube):
-        HomeeDevice.__init__(self, hass, homee_node, cube)
-        self.entity_id = "homee.cube"
-        hass.services.async_register(DOMAIN, "set_mode", self.set_mode)
+    policy = 'cube'
+    state_types = ('HomeeMode',)
+
+    def __init__(self, hass, homee_node, hub):
+        HomeeDevice.__init__(self, hass, homee_node, hub)
+        self.entity_id = "homee.cube" if not hub.name else "homee.{}_cube".format(slugify(hub.name))
+
+    @property
+    def unique_id(self):
+        """Keep the cube out of the entity registry.
+
+        Registered entities get their entity id in the domain of the
+        platform, which would turn homee.cube into sensor.cube.
+        """
+        return None
 
     @property
     def state(self):
         return self.get_attr_value('HomeeMode', 0)
 
-    async def set_mode(self, call):
-        mode = call.data.get("mode")
-        from pyhomee.const import HomeeMode
-        if mode in HomeeMode:
-            mode_num = HomeeMode.get(mode)
-            _LOGGER.info("setting mode to %s (%i)", mode, mode_num)
-            await self.set_attr("HomeeMode", mode_num)
-        else:
-            _LOGGER.error("Unkown mode %s", mode)
+    @property
+    def available(self):
+        return self.hub.supervisor.connected
+
+    @property
+    def device_state_attributes(self):
+        """Return the attributes of the cube and the connection statistics."""
+        attr = dict(HomeeDevice.device_state_attributes.fget(self))
+        attr.update(self.hub.supervisor.diagnostics())
+        if self.hub.diagnostics_attributes:
+            attr['diagnostics'] = self.hub.diagnostics()
+        return attr
@@ -0,0 +1,88 @@
+"""Persistent snapshot of the homee nodes for fast startup."""
+import logging
+import urllib.parse
+
+_LOGGER = logging.getLogger(__name__)
+
+# one snapshot per config entry
+SNAPSHOT_KEY = 'homee.snapshot.{}'
+SNAPSHOT_VERSION = 1
+# seconds to collect changes before the snapshot is written
+SNAPSHOT_SAVE_DELAY = 30
+
+
+def node_to_snapshot(node, store, groups=()):
+    """Return the compact snapshot representation of a node and its attribute store."""
+    return {
+        'id': node.id,
+        'name': node.name,
+        'profile': node.profile,
+        'groups': sorted(groups),
+        'attributes': [
+            [attr.id, attr.type, attr.unit, attr.value, attr.editable]
+            for attr in store.by_id.values()
+        ],
+    }
+
+
+def node_from_snapshot(data, state):
+    """Build a pyhomee node from its snapshot representation."""
+    from pyhomee.models import Node
+    return Node({
+        'id': data['id'],
+        'name': urllib.parse.quote(data['name']),
+        'profile': data['profile'],
+        'state': state,
+        'state_changed': 0,
+        'added': 0,
+        'attributes': [{
+            'id': attr_id,
+            'node_id': data['id'],
+            'type': attr_type,
+            'unit': urllib.parse.quote(unit),
+            'current_value': value,
+            'editable': editable,
+        } for attr_id, attr_type, unit, value, editable in data['attributes']],
+    })
+
+
+class HomeeSnapshot:
+    """Store the known nodes and their last attribute values."""
+
+    def __init__(self, hass, entry_id, nodes, node_stores, node_groups):
+        from homeassistant.helpers.storage import Store
+        self._store = Store(hass, SNAPSHOT_VERSION, SNAPSHOT_KEY.format(entry_id))
+        self._nodes = nodes
+        self._node_stores = node_stores
+        self._node_groups = node_groups
+
+    async def async_load(self):
+        """Return the nodes of the snapshot, marked as unavailable.
+
+        The group membership of the nodes is restored as well.
+        """
+        from pyhomee.const import CANodeStateUnavailable
+        try:
+            data = await self._store.async_load()
+        except NotImplementedError:
+            _LOGGER.warning("Ignoring homee snapshot of an unsupported version")
+            return []
+        if data is None:
+            return []
+        for node in data['nodes']:
+            self._node_groups[node['id']] = set(node.get('groups', []))
+        return [node_from_snapshot(node, CANodeStateUnavailable) for node in data['nodes']]
+
+    def async_schedule_save(self):
+        """Write the snapshot after a delay, collecting further changes."""
+        self._store.async_delay_save(self._data, SNAPSHOT_SAVE_DELAY)
+
+    async def async_save(self):
+        """Write the snapshot now."""
+        await self._store.async_save(self._data())
+
+    def _data(self):
+        return {'nodes': [
+            node_to_snapshot(node, self._node_stores[node.id], self._node_groups.get(node.id, ()))
+            for node in self._nodes.values() if node.id in self._node_stores
+        ]}
@@ -0,0 +1,234 @@
+"""Supervision of the websocket connection to the homee cube."""
+import asyncio
+import json
+import logging
+import random
+from collections import deque
+
+_LOGGER = logging.getLogger(__name__)
+
+BACKOFF_MIN = 1
+BACKOFF_MAX = 300
+# nodes of the node dump handled before yielding to the event loop
+DUMP_CHUNK_SIZE = 25
+# seconds between node dumps requested while connected
+RESYNC_INTERVAL = 3600
+
+
+def parse_dump(message):
+    """Parse a node dump message, return the dump and its pyhomee nodes.
+
+    Pure data preparation, run in the executor.
+    """
+    from pyhomee.models import Node
+    dump = json.loads(message)['all']
+    return dump, [Node(node) for node in dump.get('nodes', [])]
+
+
+class HomeeSupervisor:
+    """Keep the websocket connection to the cube alive.
+
+    Replaces the run loop of pyhomee: failed or dropped connections are
+    retried with jittered exponential backoff, and after every (re)connect
+    and every RESYNC_INTERVAL the full node list is requested again to
+    resync the nodes, so nodes removed without notice disappear. The node
+    dump is parsed in the executor, passed to on_dump and then handed to
+    the pyhomee callbacks in chunks, yielding to the event loop in between.
+    Homeegram updates and attribute histories, which pyhomee ignores, go
+    to on_homeegram and on_history. Every received message is passed to
+    the listeners (traffic recorder, relay) before it is handled, except
+    node dumps requested by a relay consumer, which only go to the
+    consumer. The cube answers GET:all in order, so dumps are matched with
+    the requests first in, first out.
+    """
+
+    def __init__(self, cube, on_connection_change, on_dump, metrics=None, on_homeegram=None,
+                 on_history=None):
+        self.cube = cube
+        self.metrics = metrics
+        # callbacks taking each raw message received from the cube
+        self.listeners = []
+        self.connected = False
+        self._on_connection_change = on_connection_change
+        self._on_dump = on_dump
+        self._on_homeegram = on_homeegram
+        self._on_history = on_history
+        # callbacks of the pending node dump requests, None for our own
+        self._dump_requests = deque()
+        self._attempt = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.downtime = 0
+        self._disconnected_at = None
+        # seconds the last node dump took from parsing to the last callback
+        self.dump_duration = None
+
+    def diagnostics(self):
+        """Return connection statistics."""
+        downtime = self.downtime
+        if self._disconnected_at is not None:
+            downtime += asyncio.get_event_loop().time() - self._disconnected_at
+        return {
+            'connected': self.connected,
+            'connects': self.connects,
+            'reconnects': max(self.connects - 1, 0),
+            'disconnects': self.disconnects,
+            'downtime': round(downtime, 1),
+            'dump_ms': None if self.dump_duration is None else round(self.dump_duration * 1000, 1),
+        }
+
+    async def async_run(self):
+        """Connect to the cube until cancelled."""
+        import websockets
+        self._disconnected_at = asyncio.get_event_loop().time()
+        while True:
+            try:
+                await self._async_connect()
+            except asyncio.CancelledError:
+                raise
+            except websockets.exceptions.InvalidHandshake as err:
+                _LOGGER.error("Websocket handshake failed, requesting new token: %s", err)
+                self.cube.token = None
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.error("Homee websocket connection failed: %s", err)
+            finally:
+                await self._async_set_connected(False)
+            delay = random.uniform(BACKOFF_MIN, min(BACKOFF_MAX, BACKOFF_MIN * 2 ** self._attempt))
+            self._attempt += 1
+            _LOGGER.info("Reconnecting to homee in %.1f seconds", delay)
+            await asyncio.sleep(delay)
+
+    async def _async_connect(self):
+        import websockets
+        token = await self.cube.get_token()
+        uri = "ws://{}:7681/connection?access_token={}".format(self.cube.hostname, token)
+        async with websockets.connect(uri, subprotocols=["v2"]) as ws:
+            self.cube.registry.ws = ws
+            _LOGGER.info("Connected to homee websocket")
+            self._dump_requests.clear()
+            await self._async_request_dump(ws, None)
+            resync = asyncio.ensure_future(self._async_resync(ws))
+            try:
+                async for message in ws:
+                    if not self.connected:
+                        self._attempt = 0
+                        await self._async_set_connected(True)
+                    if message.startswith('{"all"') and self._dump_requests:
+                        requester = self._dump_requests.popleft()
+                        if requester is not None:
+                            requester(message)
+                            continue
+                    for listener in self.listeners:
+                        listener(message)
+                    await self.async_handle_message(message)
+            finally:
+                resync.cancel()
+
+    async def _async_resync(self, ws):
+        while True:
+            await asyncio.sleep(RESYNC_INTERVAL)
+            await self._async_request_dump(ws, None)
+
+    async def _async_request_dump(self, ws, requester):
+        self._dump_requests.append(requester)
+        await ws.send("GET:all")
+
+    async def async_handle_message(self, message):
+        """Handle a message of the cube, received or replayed."""
+        if self.metrics is not None:
+            self.metrics.message_received()
+        if message.startswith('{"all"'):
+            await self._async_process_dump(message)
+            return
+        if message.startswith('{"homeegram"') and self._on_homeegram is not None:
+            await self._on_homeegram(json.loads(message)['homeegram'])
+            return
+        if message.startswith('{"history"') and self._on_history is not None:
+            self._on_history(json.loads(message)['history'])
+            return
+        await self.cube.registry.on_message(message)
+
+    async def async_replay_message(self, message):
+        """Handle a recorded message, return once its callbacks finished.
+
+        pyhomee runs the callbacks of node and attribute updates as tasks,
+        a replay awaits the same callbacks instead so its duration and
+        the counted state writes cover the dispatch of every message.
+        """
+        if not message.startswith(('{"node"', '{"attribute"')):
+            await self.async_handle_message(message)
+            return
+        from pyhomee.models import Attribute, Node
+        if self.metrics is not None:
+            self.metrics.message_received()
+        parsed = json.loads(message)
+        if 'node' in parsed:
+            await self._async_call_node(Node(parsed['node']))
+        if 'attribute' in parsed:
+            attribute = Attribute(parsed['attribute'])
+            for callback in list(self.cube.registry._node_callbacks.get(attribute.node_id, ())):
+                await callback(None, attribute)
+
+    async def async_send(self, message):
+        """Send a raw message to the cube, return False while disconnected."""
+        if not self.connected:
+            return False
+        await self.cube.registry.ws.send(message)
+        return True
+
+    async def async_request_dump(self, requester):
+        """Request a node dump passed only to requester, return False while disconnected."""
+        if not self.connected:
+            return False
+        await self._async_request_dump(self.cube.registry.ws, requester)
+        return True
+
+    async def _async_process_dump(self, message):
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        dump, nodes = await loop.run_in_executor(None, parse_dump, message)
+        await self._on_dump(dump)
+        for offset in range(0, len(nodes), DUMP_CHUNK_SIZE):
+            for node in nodes[offset:offset + DUMP_CHUNK_SIZE]:
+                await self._async_call_node(node)
+            await asyncio.sleep(0)
+        self.dump_duration = loop.time() - start
+        if self.metrics is not None:
+            self.metrics.observe('dump', self.dump_duration)
+        _LOGGER.info("Processed node dump of %d nodes in %.1f ms",
+                     len(nodes), self.dump_duration * 1000)
+
+    async def _async_call_node(self, node):
+        """Pass a node to the pyhomee callbacks like pyhomee does, but awaited."""
+        registry = self.cube.registry
+        registry._nodes[node.id] = node
+        # like pyhomee, nodes discovered now get no node update
+        node_callbacks = list(registry._node_callbacks.get(node.id, ()))
+        try:
+            for callback in list(registry._callbacks):
+                await callback(node)
+            for callback in node_callbacks:
+                await callback(node, None)
+        except Exception:  # pylint: disable=broad-except
+            # one broken node must not abort the others
+            _LOGGER.exception("Error processing homee node %s", node.id)
+
+    async def _async_set_connected(self, connected):
+        if connected == self.connected:
+            return
+        self.connected = connected
+        now = asyncio.get_event_loop().time()
+        if connected:
+            self.connects += 1
+            if self._disconnected_at is not None:
+                self.downtime += now - self._disconnected_at
+                self._disconnected_at = None
+        else:
+            _LOGGER.warning("Lost connection to homee")
+            self.disconnects += 1
+            self._disconnected_at = now
+        try:
+            await self._on_connection_change(connected)
+        except Exception:  # pylint: disable=broad-except
+            # never keep the supervisor from reconnecting
+            _LOGGER.exception("Error handling the homee connection change")
@@ -7,40 +7,49 @@ https://home-assistant.io/components/sensor.homee/
 import logging
 
 from homeassistant.components.switch import ENTITY_ID_FORMAT, SwitchDevice
-from homeassistant.util import slugify
-from custom_components.homee import (
-    HOMEE_CUBE, HomeeDevice)
+from custom_components.homee import DOMAIN, HomeeDevice, HomeeGroupDevice
 
 DEPENDENCIES = ['homee']
 
 _LOGGER = logging.getLogger(__name__)
 
 
-async def async_setup_platform(hass, config, async_add_devices, discovery_info=None):
-    """Perform the setup for Vera controller devices."""
-    devices = []
-    for data in discovery_info['devices']:
-        from pyhomee import const
-        node = data['node']
-        # handle double switch
-        if node.profile == const.CANodeProfileDoubleOnOffSwitch:
-            state_attributes = list(filter(lambda a: a.type == const.ATTRIBUTE_TYPES['OnOff'], node.attributes))
-            for idx, attr in enumerate(state_attributes):
-                devices.append(HomeeSwitch(hass, node, HOMEE_CUBE, idx, attr))
-        else:
-            devices.append(HomeeSwitch(hass, node, HOMEE_CUBE))
-    async_add_devices(devices)
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Add the switches discovered by the hub of a cube."""
+    from pyhomee import const
+    hub = hass.data[DOMAIN][config_entry.entry_id]
+
+    def add_devices(discovered):
+        devices = []
+        for data in discovered:
+            if 'group' in data:
+                devices.append(HomeeGroupSwitch(hass, data['group'], data['node_ids'], hub))
+                continue
+            node = data['node']
+            # handle double switch
+            if node.profile == const.CANodeProfileDoubleOnOffSwitch:
+                state_attributes = hub.dispatcher.get_store(node).all_by_type(const.ATTRIBUTE_TYPES['OnOff'])
+                for idx, attr in enumerate(state_attributes):
+                    devices.append(HomeeSwitch(hass, node, hub, idx, attr))
+            else:
+                devices.append(HomeeSwitch(hass, node, hub))
+        async_add_entities(devices)
+    hub.register_platform('switch', add_devices)
 
 class HomeeSwitch(HomeeDevice, SwitchDevice):
     """Representation of a Homee Switch."""
 
-    def __init__(self, hass, homee_node, cube, idx=0, state_attr=None):
+    policy = 'switch'
+    state_types = ('OnOff',)
+
+    def __init__(self, hass, homee_node, hub, idx=0, state_attr=None):
         """Initialize the switch."""
-        HomeeDevice.__init__(self, hass, homee_node, cube)
+        HomeeDevice.__init__(self, hass, homee_node, hub)
         if state_attr is not None:
             self._state_attr = state_attr
             # make sure OnOff attribute is the selected
-            self.homee_id = "{}_{}_{}".format(slugify(self._name), self._homee_node.id, state_attr.id)
+            self.homee_id = "{}_{}".format(self.homee_id, state_attr.id)
+            self._unique_id = "{}_{}".format(self._unique_id, state_attr.id)
             self._name = "{} {}".format(self._name, idx + 1)
         else:
             self._state_attr = self.get_attr("OnOff")
@@ -56,14 +65,37 @@ class HomeeSwitch(HomeeDevice, SwitchDevice):
 
     async def async_turn_on(self, **kwargs):
         """Turn device on."""
-        await self.cube.send_node_command(self._homee_node, self._state_attr, 1)
+        await self.send_command(self._state_attr, 1)
 
     async def async_turn_off(self, **kwargs):
         """Turn device off."""
-        await self.cube.send_node_command(self._homee_node, self._state_attr, 0)
+        await self.send_command(self._state_attr, 0)
 
     @property
     def is_on(self):
         """Return true if device is on."""
         return self._state
 
+
+class HomeeGroupSwitch(HomeeGroupDevice, SwitchDevice):
+    """Representation of a homee group of switches."""
+
+    state_types = ('OnOff',)
+
+    def __init__(self, hass, group, node_ids, hub):
+        """Initialize the switch group."""
+        HomeeGroupDevice.__init__(self, hass, group, node_ids, hub)
+        self.entity_id = ENTITY_ID_FORMAT.format(self.homee_id)
+
+    async def async_turn_on(self, **kwargs):
+        """Turn the switches on."""
+        await self.send_group_command('OnOff', 1)
+
+    async def async_turn_off(self, **kwargs):
+        """Turn the switches off."""
+        await self.send_group_command('OnOff', 0)
+
+    @property
+    def is_on(self):
+        """Return true if any switch is on."""
+        return any(self.get_attr_values('OnOff'))
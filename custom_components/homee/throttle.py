@@ -0,0 +1,63 @@
+"""Coalescing of Home Assistant state writes for chatty homee attributes."""
+import asyncio
+import numbers
+
+
+class StateWriteCoalescer:
+    """Collapse bursts of attribute updates into at most one state write.
+
+    The first update after a quiet period is written right away, updates
+    within the following window are merged and the latest one is flushed
+    when the window ends. Values which moved less than the deadband from
+    the last written value are not written at all.
+    """
+
+    def __init__(self, write, interval=0, deadband=0):
+        self._write = write
+        self.interval = interval
+        self.deadband = deadband
+        self._last_write = None
+        self._last_value = None
+        self._pending_value = None
+        self._timer = None
+
+    def update(self, value):
+        """Record a new value, return True if the state was written right away."""
+        if self._timer is not None:
+            self._pending_value = value
+            return False
+        if self._within_deadband(value):
+            return False
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+        if self._last_write is None or now - self._last_write >= self.interval:
+            self._flush_value(value, now)
+            return True
+        self._pending_value = value
+        self._timer = loop.call_later(
+            self._last_write + self.interval - now, self._flush)
+        return False
+
+    def cancel(self):
+        """Drop a pending write."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush(self):
+        self._timer = None
+        if self._within_deadband(self._pending_value):
+            return
+        self._flush_value(self._pending_value, asyncio.get_event_loop().time())
+
+    def _flush_value(self, value, now):
+        self._last_write = now
+        self._last_value = value
+        self._write()
+
+    def _within_deadband(self, value):
+        if not self.deadband or self._last_write is None:
+            return False
+        if not isinstance(value, numbers.Number) or not isinstance(self._last_value, numbers.Number):
+            return False
+        return abs(value - self._last_value) < self.deadband
@@ -0,0 +1,116 @@
+"""Buffering of raw values of high rate homee attributes."""
+import asyncio
+import json
+import logging
+import numbers
+import time
+from array import array
+
+_LOGGER = logging.getLogger(__name__)
+
+AGGREGATES = ['mean', 'min', 'max', 'last']
+
+
+def write_series(path, series):
+    """Write exported series as JSON, return whether it succeeded.
+
+    Blocking, run in the executor.
+    """
+    try:
+        with open(path, 'w') as export:
+            json.dump(series, export)
+    except OSError as err:
+        _LOGGER.error("Unable to export homee series to %s: %s", path, err)
+        return False
+    return True
+
+
+class SeriesBuffer:
+    """Record every value of an attribute, publish an aggregate per interval.
+
+    Timestamps and values are kept in two preallocated arrays of doubles
+    used as ring buffer, the oldest samples are overwritten once size
+    samples are stored. Instead of a state write per sample, the mean,
+    min, max and last value of the samples received within the last
+    interval are published once per interval. Values which are not
+    numbers are written right away and not buffered.
+
+    The interface matches StateWriteCoalescer, so the buffer can take its
+    place in HomeeDevice.
+    """
+
+    def __init__(self, write, size, interval, aggregate='mean'):
+        self._write = write
+        self.size = size
+        self.interval = interval
+        self.aggregate = aggregate
+        self._times = array('d', bytes(8 * size))
+        self._values = array('d', bytes(8 * size))
+        # index of the next sample to write and number of stored samples
+        self._next = 0
+        self.count = 0
+        # samples received since the last publish
+        self._window = 0
+        self.stats = None
+        self._timer = None
+
+    def update(self, value):
+        """Record a new value, return True if the state was written right away."""
+        if not isinstance(value, numbers.Number):
+            self._write()
+            return True
+        self._times[self._next] = time.time()
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self._window += 1
+        if self._timer is None:
+            self._timer = asyncio.get_event_loop().call_later(self.interval, self._flush)
+        return False
+
+    def cancel(self):
+        """Stop publishing."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    @property
+    def value(self):
+        """Return the published aggregate, None before the first interval ended."""
+        if self.stats is None:
+            return None
+        return self.stats[self.aggregate]
+
+    def samples(self, since=None):
+        """Return the stored samples as [timestamp, value] pairs, oldest first."""
+        start = (self._next - self.count) % self.size
+        samples = []
+        for offset in range(self.count):
+            idx = (start + offset) % self.size
+            if since is None or self._times[idx] >= since:
+                samples.append([self._times[idx], self._values[idx]])
+        return samples
+
+    def _flush(self):
+        self._timer = None
+        count = min(self._window, self.count)
+        if not count:
+            # nothing received, restart with the next sample
+            return
+        self._window = 0
+        total = 0
+        minimum = maximum = None
+        for offset in range(1, count + 1):
+            value = self._values[(self._next - offset) % self.size]
+            total += value
+            minimum = value if minimum is None else min(minimum, value)
+            maximum = value if maximum is None else max(maximum, value)
+        self.stats = {
+            'mean': total / count,
+            'min': minimum,
+            'max': maximum,
+            'last': self._values[(self._next - 1) % self.size],
+            'count': count,
+        }
+        self._write()
+        self._timer = asyncio.get_event_loop().call_later(self.interval, self._flush)
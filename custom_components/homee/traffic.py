@@ -0,0 +1,117 @@
+"""Recording and replay of the websocket traffic of a homee cube."""
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# seconds recorded messages are buffered before they are written
+FLUSH_INTERVAL = 1
+# messages replayed at maximum speed before yielding to the event loop
+REPLAY_CHUNK_SIZE = 100
+
+
+class TrafficRecorder:
+    """Append the received messages to a log file with rotation.
+
+    Every message is one line of the receive time in milliseconds since the
+    epoch and the raw message, separated by a tab. Lines are buffered and
+    written in the executor once per FLUSH_INTERVAL, one write at a time so
+    the order is kept. Once the log reaches max_bytes it is gzipped to
+    path.1.gz, older logs are shifted up to path.<backups>.gz.
+    """
+
+    def __init__(self, path, max_bytes, backups):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.messages = 0
+        self._lines = []
+        self._timer = None
+        self._job = None
+
+    def record(self, message):
+        """Buffer a received message."""
+        self._lines.append('{}\t{}\n'.format(int(time.time() * 1000), message.replace('\n', ' ')))
+        self.messages += 1
+        if self._timer is None:
+            self._timer = asyncio.get_event_loop().call_later(FLUSH_INTERVAL, self._flush)
+
+    async def async_close(self):
+        """Write the buffered messages."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._job is not None:
+            await self._job
+        if self._lines:
+            lines, self._lines = self._lines, []
+            await asyncio.get_event_loop().run_in_executor(None, self._write, lines)
+
+    def _flush(self):
+        loop = asyncio.get_event_loop()
+        if self._job is not None and not self._job.done():
+            # keep the order, retry once the previous write finished
+            self._timer = loop.call_later(FLUSH_INTERVAL, self._flush)
+            return
+        self._timer = None
+        lines, self._lines = self._lines, []
+        self._job = loop.run_in_executor(None, self._write, lines)
+
+    def _write(self, lines):
+        try:
+            with open(self.path, 'a') as log:
+                log.writelines(lines)
+                size = log.tell()
+            if size >= self.max_bytes:
+                self._rotate()
+        except OSError as err:
+            _LOGGER.error("Unable to record homee traffic to %s: %s", self.path, err)
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = '{}.{}.gz'.format(self.path, index)
+            if os.path.exists(source):
+                os.replace(source, '{}.{}.gz'.format(self.path, index + 1))
+        if self.backups:
+            with open(self.path, 'rb') as log, gzip.open(self.path + '.1.gz', 'wb') as backup:
+                shutil.copyfileobj(log, backup)
+        os.remove(self.path)
+
+
+def load_traffic(paths):
+    """Return the (timestamp, message) pairs of recorded logs, in the given order.
+
+    Logs ending with .gz are decompressed. Blocking, run in the executor.
+    """
+    messages = []
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt') as log:
+            for line in log:
+                timestamp, _, message = line.rstrip('\n').partition('\t')
+                messages.append((int(timestamp) / 1000, message))
+    return messages
+
+
+async def async_replay(messages, handle, speed=1.0):
+    """Feed recorded messages to handle, return the seconds the replay took.
+
+    The gaps between the messages are replayed divided by speed, with
+    speed 0 the messages are replayed as fast as they are handled.
+    """
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    first = messages[0][0] if messages else 0
+    for index, (timestamp, message) in enumerate(messages):
+        if speed:
+            delay = start + (timestamp - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif index % REPLAY_CHUNK_SIZE == 0:
+            await asyncio.sleep(0)
+        await handle(message)
+    return loop.time() - start
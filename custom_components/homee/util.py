@@ -1,13 +1,172 @@
+from .const import DISCOVER_SENSOR_ATTRIBUTES
 
+_ATTRIBUTE_TYPES_LOOKUP = None
+_ATTRIBUTE_TYPES = None
+_PROFILE_COMPONENTS = None
+_COVER_POSITION = None
+_STATE_AVAILABLE = None
+_STATE_DELETING = None
+_NOT_SENSOR_TYPES = frozenset(DISCOVER_SENSOR_ATTRIBUTES)
 
-def get_attr_by_type(node, type):
-    for attr in node.attributes:
-        if attr.type == type:
-            return attr
-    return None
+
+class AttributeRecord:
+    """Compact copy of a pyhomee attribute."""
+
+    __slots__ = ('id', 'node_id', 'type', 'unit', 'value', 'editable')
+
+    def __init__(self, attribute):
+        self.id = attribute.id
+        self.node_id = attribute.node_id
+        self.type = attribute.type
+        self.unit = attribute.unit
+        self.value = attribute.value
+        self.editable = attribute.editable
+
+
+class NodeAttributeStore:
+    """Attributes of a node, shared by all entities of the node.
+
+    The state attributes built from the values are cached per set of
+    shown attribute types until a value changes.
+    """
+
+    __slots__ = ('node', 'by_id', 'by_type', 'by_name', '_state_attributes')
+
+    def __init__(self, node):
+        self.node = None
+        self.by_id = {}
+        self.by_type = {}
+        self.by_name = {}
+        self._state_attributes = None
+        self.update_node(node)
+
+    def update_node(self, node):
+        """Take over the attributes of a node.
+
+        Returns the records whose value changed, or None if the set of
+        attributes changed and the records were rebuilt.
+        """
+        self.node = node
+        if self.by_id.keys() == set(attr.id for attr in node.attributes):
+            changed = []
+            for attr in node.attributes:
+                record = self.set_value(attr.id, attr.value)
+                if record is not None:
+                    changed.append(record)
+            return changed
+        self.by_id.clear()
+        self.by_type.clear()
+        self.by_name.clear()
+        for attr in node.attributes:
+            record = AttributeRecord(attr)
+            self.by_id[record.id] = record
+            self.by_type.setdefault(record.type, []).append(record)
+            self.by_name[get_attr_type(record)] = record
+        self._state_attributes = None
+        return None
+
+    def set_value(self, attribute_id, value):
+        """Update a value, returning the record if it changed."""
+        record = self.by_id.get(attribute_id)
+        if record is None or record.value == value:
+            return None
+        record.value = value
+        self._state_attributes = None
+        return record
+
+    def get(self, attribute_id):
+        return self.by_id.get(attribute_id)
+
+    def get_by_type(self, type):
+        attrs = self.by_type.get(type)
+        return attrs[0] if attrs else None
+
+    def all_by_type(self, type):
+        return self.by_type.get(type, [])
+
+    def state_attributes(self, types=None):
+        """Return the attribute values by type name, shared by the entities.
+
+        types is a frozenset of the type names to include, None includes all.
+        """
+        if self._state_attributes is None:
+            self._state_attributes = {}
+        attr = self._state_attributes.get(types)
+        if attr is None:
+            attr = {name: record.value for name, record in self.by_name.items()
+                    if types is None or name in types}
+            if 'BatteryLowAlarm' in attr:
+                attr['battery_level'] = 100 if (attr['BatteryLowAlarm'] or 0) == 0 else 0
+            self._state_attributes[types] = attr
+        return attr
+
+
+def _load_constants():
+    """Import the pyhomee constants used on hot paths once.
+
+    pyhomee pulls in aiohttp and websockets, so it is not imported before
+    the first node arrives.
+    """
+    global _ATTRIBUTE_TYPES_LOOKUP, _ATTRIBUTE_TYPES, _PROFILE_COMPONENTS, _COVER_POSITION, \
+        _STATE_AVAILABLE, _STATE_DELETING
+    from pyhomee import const
+    _ATTRIBUTE_TYPES = const.ATTRIBUTE_TYPES
+    _COVER_POSITION = const.COVER_POSITION
+    _STATE_AVAILABLE = const.CANodeStateAvailable
+    _STATE_DELETING = const.CANodeStateDeleteInProgress
+    _PROFILE_COMPONENTS = {}
+    # the first platform listing a profile wins
+    for component, discover in (('light', const.DISCOVER_LIGHTS),
+                                ('climate', const.DISCOVER_CLIMATE),
+                                ('binary_sensor', const.DISCOVER_BINARY_SENSOR),
+                                ('switch', const.DISCOVER_SWITCH)):
+        for profile in const.PROFILE_TYPES[discover]:
+            _PROFILE_COMPONENTS.setdefault(profile, component)
+    _ATTRIBUTE_TYPES_LOOKUP = const.ATTRIBUTE_TYPES_LOOKUP
+    return _ATTRIBUTE_TYPES_LOOKUP
 
 
 def get_attr_type(attr):
     """get attribute name by its type"""
-    from pyhomee.const import ATTRIBUTE_TYPES_LOOKUP
-    return ATTRIBUTE_TYPES_LOOKUP.get(attr.type, ATTRIBUTE_TYPES_LOOKUP[0])
+    lookup = _ATTRIBUTE_TYPES_LOOKUP or _load_constants()
+    return lookup.get(attr.type, lookup[0])
+
+
+def get_attr_type_id(name):
+    """Return the attribute type of an attribute type name."""
+    if _ATTRIBUTE_TYPES_LOOKUP is None:
+        _load_constants()
+    return _ATTRIBUTE_TYPES[name]
+
+
+def is_available(node):
+    """Return whether the cube reports a node as available."""
+    if _ATTRIBUTE_TYPES_LOOKUP is None:
+        _load_constants()
+    return node.state == _STATE_AVAILABLE
+
+
+def is_deleting(node):
+    """Return whether the cube is removing a node."""
+    if _ATTRIBUTE_TYPES_LOOKUP is None:
+        _load_constants()
+    return node.state == _STATE_DELETING
+
+
+def is_sensor_attribute(node, attribute):
+    """Return whether an attribute is exposed as a separate sensor."""
+    return node.id != -1 and get_attr_type(attribute) not in _NOT_SENSOR_TYPES
+
+
+def map_homee_node(node):
+    """Map homee nodes to Home Assistant types."""
+    if node.id == -1:
+        return 'sensor'
+    if _ATTRIBUTE_TYPES_LOOKUP is None:
+        _load_constants()
+    component = _PROFILE_COMPONENTS.get(node.profile)
+    if component is not None:
+        return component
+
+    if any(attr.type == _COVER_POSITION for attr in node.attributes):
+        return 'cover'
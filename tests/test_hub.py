@@ -0,0 +1,82 @@
+"""Tests of the node handling of HomeeHub."""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('homeassistant')
+pytest.importorskip('pyhomee')
+
+from custom_components.homee import CUBE_SCHEMA  # noqa: E402
+from custom_components.homee.hub import HomeeHub  # noqa: E402
+
+
+class FakeBus:
+    def __init__(self):
+        self.events = []
+
+    def async_fire(self, event_type, data):
+        self.events.append((event_type, data))
+
+
+class FakeHass:
+    def __init__(self, loop):
+        self.loop = loop
+        self.bus = FakeBus()
+
+
+class FakeEntry:
+    entry_id = 'entry'
+
+
+def node_data(state=1, value=0):
+    return {
+        'id': 4, 'name': 'Plug', 'profile': 10, 'state': state, 'state_changed': 0, 'added': 0,
+        'attributes': [{'id': 40, 'node_id': 4, 'type': 1, 'unit': '', 'current_value': value,
+                        'editable': 1}],
+    }
+
+
+def attribute_message(value):
+    return json.dumps({'attribute': {'id': 40, 'node_id': 4, 'type': 1, 'unit': '',
+                                     'current_value': value, 'editable': 1}})
+
+
+def test_node_removed_and_added_again_is_dispatched_once():
+    from pyhomee.models import Node
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    hass = FakeHass(loop)
+    hub = HomeeHub(hass, FakeEntry(), CUBE_SCHEMA({
+        'cube': 'cube', 'username': 'user', 'password': 'password', 'snapshot': False,
+        'events': ['OnOff']}))
+
+    async def run():
+        hub.cube.register_all(hub.async_handle_node)
+        await hub.supervisor._async_call_node(Node(node_data()))
+        # the cube deletes the node, then it is paired again with the same id
+        await hub.supervisor._async_call_node(Node(node_data(state=9)))
+        assert 4 not in hub.nodes
+        await hub.supervisor._async_call_node(Node(node_data()))
+        assert 4 in hub.nodes
+
+        updates = []
+
+        async def update_callback(node, attribute):
+            updates.append(attribute.value)
+        hub.dispatcher.register(hub.nodes[4], update_callback, [40])
+
+        await hub.supervisor.async_replay_message(attribute_message(1))
+        await hub.supervisor.async_replay_message(attribute_message(0))
+        assert updates == [1, 0]
+        assert [data['value'] for _, data in hass.bus.events] == [1, 0]
+
+        if hub._flush_handle is not None:
+            hub._flush_handle.cancel()
+        await hub.cube.session.close()
+
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()